@@ -0,0 +1,108 @@
+"""Import cost of each collector module, measured with ``python -X importtime``.
+
+Usage:
+    python benchmarks/collector_import_bench.py [--rev HEAD~1] [--repeat 5]
+
+Every module is imported in a fresh interpreter with placeholder credentials
+set (an import must not need real ones), and the cumulative import time that
+``-X importtime`` reports for it is kept. The median of ``--repeat`` runs is
+printed. With ``--rev``, the collectors/ tree of that git revision is
+exported to a temporary directory and measured alongside the working tree,
+for a before/after table.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from io import BytesIO
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = [
+    "nomura_scraper",
+    "dc_scraper",
+    "scraper_runner",
+    "backfill",
+    "replay_harness",
+    "telemetry",
+]
+PLACEHOLDER_ENV = {
+    "SUPABASE_URL": "http://127.0.0.1:9",
+    "SUPABASE_KEY": "placeholder",
+    "NOMURA_LOGIN_ID": "placeholder",
+    "NOMURA_PASSWORD": "placeholder",
+    "PENSION_START_URL": "http://127.0.0.1:9",
+    "PENSION_ACCOUNT_ID": "placeholder",
+    "PENSION_PASSWORD": "placeholder",
+    "SCRAPER_SESSIONS": "off",
+}
+
+
+def import_time_us(collectors_dir: str, module: str) -> Optional[int]:
+    """Cumulative import time of ``module`` in microseconds; None if the import fails."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=collectors_dir,
+        env={**os.environ, **PLACEHOLDER_ENV, "PYTHONPATH": collectors_dir, "PYTHONDONTWRITEBYTECODE": "1"},
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        return None
+    for line in reversed(completed.stderr.splitlines()):
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1])
+    return None
+
+
+def measure(collectors_dir: str, repeat: int) -> Dict[str, Optional[float]]:
+    results: Dict[str, Optional[float]] = {}
+    for module in MODULES:
+        if not os.path.exists(os.path.join(collectors_dir, f"{module}.py")):
+            results[module] = None
+            continue
+        samples: List[int] = [us for us in (import_time_us(collectors_dir, module) for _ in range(repeat)) if us]
+        results[module] = statistics.median(samples) / 1000 if samples else None
+    return results
+
+
+def export_collectors(rev: str, directory: str) -> str:
+    archive = subprocess.run(
+        ["git", "archive", "--format=tar", rev, "collectors"], cwd=REPO_ROOT, capture_output=True, check=True
+    ).stdout
+    with tarfile.open(fileobj=BytesIO(archive)) as tar:
+        tar.extractall(directory)
+    return os.path.join(directory, "collectors")
+
+
+def cell(value: Optional[float]) -> str:
+    return f"{value:9.1f}" if value is not None else f"{'n/a':>9s}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rev", help="git revision to compare against, e.g. HEAD~1")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    current = measure(os.path.join(REPO_ROOT, "collectors"), args.repeat)
+    if not args.rev:
+        print(f"{'module':18s} {'ms':>9s}")
+        for module in MODULES:
+            print(f"{module:18s} {cell(current[module])}")
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        before = measure(export_collectors(args.rev, directory), args.repeat)
+    print(f"{'module':18s} {args.rev[:9]:>9s} {'now':>9s}  (ms, median of {args.repeat})")
+    for module in MODULES:
+        print(f"{module:18s} {cell(before[module])} {cell(current[module])}")
+
+
+if __name__ == "__main__":
+    main()
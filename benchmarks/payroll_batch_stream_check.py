@@ -0,0 +1,99 @@
+"""Check that a batch response streams its records while the batch is still parsing.
+
+Usage:
+    python benchmarks/payroll_batch_stream_check.py [--files 8] [--workers 1] [--pdf path/to/slip.pdf]
+
+Starts payroll-parser-service/serve.py (result cache disabled) with few
+workers and posts one zip of ``--files`` copies of the slip. The time at which
+the response headers and every NDJSON record arrive is printed. With fewer
+workers than files, the last file can only be submitted after earlier ones
+finished. The first record must therefore arrive in the first half of the
+batch, not in one burst at the end.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from io import BytesIO
+from typing import List, Tuple
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from payroll_service_load import start_server  # noqa: E402
+from payroll_worker_bench import write_sample_pdf  # noqa: E402
+
+
+def zip_of(pdf: bytes, count: int) -> bytes:
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for index in range(count):
+            archive.writestr(f"slip-{index:03d}.pdf", pdf)
+    return buffer.getvalue()
+
+
+def post_batch(url: str, body: bytes) -> Tuple[float, List[Tuple[float, dict]]]:
+    """POST ``body`` as a zip; returns when the headers arrived and each record with its arrival time."""
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=120)
+    started = time.perf_counter()
+    connection.request("POST", parts.path, body, {"Content-Type": "application/zip"})
+    response = connection.getresponse()
+    headers_at = time.perf_counter() - started
+    records = []
+    for line in response:
+        records.append((time.perf_counter() - started, json.loads(line)))
+    connection.close()
+    return headers_at, records
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--pdf")
+    args = parser.parse_args()
+
+    if args.pdf:
+        with open(args.pdf, "rb") as file:
+            pdf = file.read()
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            pdf_path = os.path.join(workdir, "sample.pdf")
+            write_sample_pdf(pdf_path)
+            with open(pdf_path, "rb") as file:
+                pdf = file.read()
+
+    server, url = start_server(["--workers", str(args.workers)])
+    try:
+        post_batch(url, zip_of(pdf, 1))  # warm up the worker processes
+        headers_at, records = post_batch(url, zip_of(pdf, args.files))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    print(f"headers   {headers_at * 1000:8.1f} ms")
+    for arrived_at, record in records:
+        print(f"record {record['index']:<3}{arrived_at * 1000:8.1f} ms  success={record['success']}")
+
+    failures = []
+    if len(records) != args.files:
+        failures.append(f"expected {args.files} records, got {len(records)}")
+    elif args.files > args.workers:
+        first_at, last_at = records[0][0], records[-1][0]
+        if first_at > last_at / 2:
+            failures.append(f"first record at {first_at * 1000:.1f} ms of {last_at * 1000:.1f} ms: not streamed")
+    for failure in failures:
+        print(failure)
+    print("streaming: " + ("OK" if not failures else "FAILED"))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Peak Python heap per request of the payroll parse handler, by upload size.
+
+Usage:
+    python benchmarks/payroll_body_memory_bench.py [--rev HEAD~1] [--sizes 0.1,1,5,20]
+
+For every size (MiB), the sample payslip is padded to that size with an
+incompressible attachment. One POST is then run through ``handler.do_POST``
+in-process. The body arrives through a buffered reader in 64 KiB chunks,
+as it would from ``socket.makefile("rb")``. The peak that ``tracemalloc``
+reports during the request is printed next to the body size. The ratio is
+how many copies of the body the request held at once.
+A non-PDF body of the same size measures how much is read before it is
+rejected. With ``--rev``, the handler of that git revision is measured
+alongside the working tree.
+
+The result cache is disabled, so every request parses. tracemalloc only
+sees Python allocations; MuPDF's own heap is not included.
+"""
+
+import argparse
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from io import BufferedReader, BytesIO, RawIOBase
+from types import ModuleType
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from payroll_worker_bench import REPO_ROOT, write_sample_pdf  # noqa: E402
+
+os.environ["PAYROLL_CACHE"] = "off"
+sys.path.append(os.path.join(REPO_ROOT, "collectors"))
+HANDLER_PATH = os.path.join("payroll-parser-service", "api", "index.py")
+MIB = 1024 * 1024
+
+
+def padded_pdf(sample_path: str, size: int) -> bytes:
+    import fitz
+
+    with fitz.open(sample_path) as document:
+        padding = max(0, size - len(document.tobytes()))
+        if padding:
+            document.embfile_add("padding.bin", os.urandom(padding))
+        return document.tobytes()
+
+
+def load_handler(path: str, name: str) -> ModuleType:
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def handler_at(rev: str, directory: str) -> ModuleType:
+    source = subprocess.run(
+        ["git", "show", f"{rev}:{HANDLER_PATH}"], cwd=REPO_ROOT, capture_output=True, check=True
+    ).stdout
+    path = os.path.join(directory, "index_rev.py")
+    with open(path, "wb") as file:
+        file.write(source)
+    return load_handler(path, "index_rev")
+
+
+class ChunkedStream(RawIOBase):
+    """Raw stream handing out ``body`` at most ``chunk`` bytes per read, like a socket."""
+
+    def __init__(self, body: bytes, chunk: int = 64 * 1024):
+        self.view = memoryview(body)
+        self.chunk = chunk
+        self.offset = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = min(len(buffer), self.chunk, len(self.view) - self.offset)
+        buffer[:count] = self.view[self.offset : self.offset + count]
+        self.offset += count
+        return count
+
+
+def post(module: ModuleType, body: bytes, content_type: str) -> str:
+    """Run one POST through ``module.handler`` without a socket; returns the status line."""
+
+    class InProcessHandler(module.handler):
+        def __init__(self):
+            self.rfile = BufferedReader(ChunkedStream(body))
+            self.wfile = BytesIO()
+            self.headers = {"content-length": str(len(body)), "content-type": content_type}
+            self.path = "/api"
+            self.request_version = "HTTP/1.1"
+            self.requestline = "POST /api HTTP/1.1"
+            self.client_address = ("127.0.0.1", 0)
+            self.close_connection = False
+
+        def log_message(self, format, *args):
+            pass
+
+    request = InProcessHandler()
+    request.do_POST()
+    return request.wfile.getvalue().split(b"\r\n", 1)[0].decode("latin-1")
+
+
+def peak_bytes(module: ModuleType, body: bytes, content_type: str) -> int:
+    # The body itself already exists before the request, like bytes in a socket buffer; only the handler is traced.
+    tracemalloc.start()
+    try:
+        post(module, body, content_type)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def measure(module: ModuleType, bodies: Dict[float, bytes]) -> Dict[str, List[int]]:
+    post(module, bodies[min(bodies)], "application/pdf")  # warm up imports and PyMuPDF
+    return {
+        "pdf": [peak_bytes(module, body, "application/pdf") for body in bodies.values()],
+        "not_pdf": [peak_bytes(module, b"\0" * len(body), "application/pdf") for body in bodies.values()],
+    }
+
+
+def cell(value: int, size: int) -> str:
+    return f"{value / MIB:8.2f} MiB {value / size:5.2f}x"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rev", help="git revision to compare against, e.g. HEAD~1")
+    parser.add_argument("--sizes", default="0.1,1,5,20", help="body sizes in MiB, comma separated")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        sample_path = os.path.join(directory, "sample.pdf")
+        write_sample_pdf(sample_path)
+        # Just under each size, so the largest one still fits PAYROLL_MAX_BODY_BYTES (20 MiB by default).
+        sizes = [float(size) for size in args.sizes.split(",")]
+        bodies = {size: padded_pdf(sample_path, int(size * MIB) - 4096) for size in sizes}
+
+        runs = {"now": measure(load_handler(os.path.join(REPO_ROOT, HANDLER_PATH), "index_now"), bodies)}
+        if args.rev:
+            runs = {args.rev[:9]: measure(handler_at(args.rev, directory), bodies), **runs}
+
+    for kind in ("pdf", "not_pdf"):
+        print(f"\n{kind} body    " + "".join(f"{name:>18s}" for name in runs))
+        for index, body in enumerate(bodies.values()):
+            cells = "".join(f" {cell(run[kind][index], len(body))}" for run in runs.values())
+            print(f"{len(body) / MIB:8.2f} MiB  {cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Equivalence check and micro-benchmark for payroll_core.text.extract_details.
+
+Usage:
+    python benchmarks/payroll_extract_bench.py            # check, then benchmark
+    python benchmarks/payroll_extract_bench.py --check    # golden files + randomized equivalence only
+    python benchmarks/payroll_extract_bench.py --regenerate-golden
+
+The golden corpus lives in benchmarks/golden/payroll_details as ``*.txt``
+pages with the expected ``*.json`` output next to each. ``legacy_extract_details``
+is the previous three-regexes-per-line implementation, kept here as the
+reference that the single-pass engine must match exactly (including the
+order of keys).
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Dict, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GOLDEN_DIR = os.path.join(REPO_ROOT, "benchmarks", "golden", "payroll_details")
+sys.path.insert(0, os.path.join(REPO_ROOT, "collectors"))
+
+from payroll_core.text import (  # noqa: E402
+    INLINE_NUMBER_PATTERN,
+    NUMBER_ONLY_PATTERN,
+    TRAILING_NUMBER_PATTERN,
+    clean_label,
+    clean_number,
+    extract_details,
+    is_valid_label,
+    normalize_text,
+)
+
+LINE_COUNTS = [10, 100, 1_000, 10_000]
+LABELS = ["基本給", "役職手当", "残業手当", "通勤手当", "所得税", "住民税", "健康保険", "厚生年金", "雇用保険"]
+FRAGMENTS = [":", "：", " ", "　", "\t", "-", "¥", "￥", ",", ".", "+", "1", "9", "０", "５", "円", "支給", "A"]
+
+
+def legacy_extract_details(page_text: str) -> Dict[str, str]:
+    details: Dict[str, str] = {}
+    pending_label: Optional[str] = None
+
+    for raw_line in page_text.splitlines():
+        line = normalize_text(raw_line)
+        if not line:
+            continue
+
+        if pending_label and NUMBER_ONLY_PATTERN.fullmatch(line):
+            details[pending_label] = clean_number(line)
+            pending_label = None
+            continue
+
+        for match in INLINE_NUMBER_PATTERN.finditer(line):
+            label = clean_label(match.group("label"))
+            number = clean_number(match.group("number"))
+            if is_valid_label(label):
+                details[label] = number
+
+        trailing_match = TRAILING_NUMBER_PATTERN.match(line)
+        if trailing_match:
+            label = clean_label(trailing_match.group("label"))
+            number = clean_number(trailing_match.group("number"))
+            if is_valid_label(label):
+                details[label] = number
+                pending_label = None
+                continue
+
+        if line.endswith(":") or line.endswith("："):
+            label = clean_label(line[:-1])
+            pending_label = label if is_valid_label(label) else None
+            continue
+
+        pending_label = None
+
+    return details
+
+
+def synthetic_line(rng: random.Random) -> str:
+    label = rng.choice(LABELS)
+    amount = f"{rng.randint(0, 999_999):,}"
+    return rng.choice(
+        [
+            f"{label}: {amount}",
+            f"{label}：{amount}",
+            f"{label} {amount}",
+            f"{label}\t{amount}円",
+            f"{label}:",
+            amount,
+            f"{label}: {amount} {rng.choice(LABELS)}: {amount}",
+            "支給",
+            "2026年3月分 給与明細",
+        ]
+    )
+
+
+def synthetic_page(lines: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "\n".join(synthetic_line(rng) for _ in range(lines))
+
+
+def fuzz_line(rng: random.Random) -> str:
+    return "".join(rng.choice(FRAGMENTS + LABELS) for _ in range(rng.randint(1, 12)))
+
+
+def check_golden(regenerate: bool) -> int:
+    failures = 0
+    for text_path in sorted(glob.glob(os.path.join(GOLDEN_DIR, "*.txt"))):
+        json_path = text_path[:-4] + ".json"
+        with open(text_path, encoding="utf-8") as file:
+            actual = extract_details(file.read())
+
+        if regenerate:
+            with open(json_path, "w", encoding="utf-8") as file:
+                json.dump(actual, file, ensure_ascii=False, indent=2)
+                file.write("\n")
+            continue
+
+        with open(json_path, encoding="utf-8") as file:
+            expected = json.load(file)
+        if list(actual.items()) != list(expected.items()):
+            failures += 1
+            print(f"GOLDEN MISMATCH {os.path.basename(text_path)}\n  expected={expected}\n  actual=  {actual}")
+    return failures
+
+
+def check_randomized(pages: int = 2_000, seed: int = 1) -> int:
+    rng = random.Random(seed)
+    failures = 0
+    for _ in range(pages):
+        page = "\n".join(fuzz_line(rng) for _ in range(rng.randint(1, 8)))
+        expected = legacy_extract_details(page)
+        actual = extract_details(page)
+        if list(actual.items()) != list(expected.items()):
+            failures += 1
+            if failures <= 5:
+                print(f"RANDOM MISMATCH {page!r}\n  expected={expected}\n  actual=  {actual}")
+    return failures
+
+
+def bench(function, page: str, budget: float = 0.5) -> float:
+    timings = []
+    deadline = time.perf_counter() + budget
+    while len(timings) < 3 or time.perf_counter() < deadline:
+        started = time.perf_counter()
+        function(page)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--check", action="store_true", help="only run the equivalence checks")
+    parser.add_argument("--regenerate-golden", action="store_true")
+    args = parser.parse_args()
+
+    failures = check_golden(args.regenerate_golden)
+    if args.regenerate_golden:
+        print(f"golden files rewritten in {GOLDEN_DIR}")
+        return
+    failures += check_randomized()
+    print("equivalence: " + ("OK" if not failures else f"{failures} mismatches"))
+    if failures:
+        sys.exit(1)
+    if args.check:
+        return
+
+    print(f"{'lines':>7} {'legacy ms':>10} {'single-pass ms':>15} {'speedup':>8}")
+    for lines in LINE_COUNTS:
+        page = synthetic_page(lines)
+        legacy = bench(legacy_extract_details, page)
+        current = bench(extract_details, page)
+        print(f"{lines:7d} {legacy * 1000:10.3f} {current * 1000:15.3f} {legacy / current:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Text vs layout extraction on table-dense payroll pages.
+
+Usage:
+    python benchmarks/payroll_layout_bench.py [--rows 10 20 40] [--runs 20]
+
+Each synthetic page carries a two-column 支給/控除 table of ``rows`` rows
+plus a header-over-value attendance block, i.e. the layouts the flattened
+text path mis-pairs. For both modes the script reports the median time per
+page (text extraction included) and the share of fields paired correctly.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Dict, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "collectors"))
+
+import fitz  # noqa: E402
+
+from payroll_core import iter_page_details  # noqa: E402
+
+ATTENDANCE = {"出勤日数": "20", "欠勤日数": "0", "有給取得": "1.5"}
+
+
+def build_table_page(rows: int) -> Tuple[bytes, Dict[str, str]]:
+    expected: Dict[str, str] = {}
+    with fitz.open() as document:
+        page = document.new_page(height=max(842, 140 + rows * 16 + 60))
+
+        def put(x: float, y: float, text: str) -> None:
+            page.insert_text((x, y), text, fontname="japan", fontsize=9)
+
+        put(60, 50, "2026年5月分 給与明細")
+        put(60, 80, "支給")
+        put(320, 80, "控除")
+        y = 100
+        for row in range(rows):
+            pay_label, pay_value = f"支給項目{row + 1}", f"{(row + 1) * 1234:,}"
+            ded_label, ded_value = f"控除項目{row + 1}", f"{(row + 1) * 321:,}"
+            put(60, y, pay_label)
+            put(230, y, pay_value)
+            put(320, y, ded_label)
+            put(490, y, ded_value)
+            expected[pay_label] = pay_value.replace(",", "")
+            expected[ded_label] = ded_value.replace(",", "")
+            y += 16
+
+        y += 20
+        for column, (label, value) in enumerate(ATTENDANCE.items()):
+            put(60 + column * 110, y, label)
+            put(60 + column * 110, y + 16, value)
+        expected.update(ATTENDANCE)
+        return document.tobytes(), expected
+
+
+def run_mode(pdf_bytes: bytes, mode: str, runs: int) -> Tuple[float, Dict[str, str]]:
+    timings = []
+    details: Dict[str, str] = {}
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as document:
+        for _ in range(runs):
+            started = time.perf_counter()
+            details = dict(next(iter_page_details(document, mode))[1])
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings), details
+
+
+def accuracy(actual: Dict[str, str], expected: Dict[str, str]) -> float:
+    correct = sum(1 for label, value in expected.items() if actual.get(label) == value)
+    return correct / len(expected)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 20, 40])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'rows':>5} {'mode':<7} {'p50 ms':>8} {'accuracy':>9} {'spurious':>9}")
+    for rows in args.rows:
+        pdf_bytes, expected = build_table_page(rows)
+        for mode in ("text", "layout"):
+            elapsed, details = run_mode(pdf_bytes, mode, args.runs)
+            spurious = sum(1 for label in details if label not in expected)
+            print(f"{rows:5d} {mode:<7} {elapsed * 1000:8.2f} {accuracy(details, expected) * 100:8.1f}% {spurious:9d}")
+
+
+if __name__ == "__main__":
+    main()
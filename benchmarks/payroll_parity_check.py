@@ -0,0 +1,153 @@
+"""Check that the CLI and the payroll-parser-service return the same parse.
+
+Usage:
+    python benchmarks/payroll_parity_check.py [--pdf path/to/slip.pdf ...]
+
+Both entry points wrap payroll_core, so for every PDF and extraction mode the
+CLI (run as a subprocess, the way the web worker runs it) and the service's
+``parse_pdf_bytes`` must agree on month, type, details and slips. Without
+``--pdf`` a small synthetic corpus is generated: a simple slip, a multi-page
+file with two months and a continuation page, a two-column table, a slip
+written with full-width digits and colons, and a page with no fields.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from payroll_worker_bench import PARSER_SCRIPT, REPO_ROOT, write_sample_pdf  # noqa: E402
+
+os.environ["PAYROLL_CACHE"] = "off"
+sys.path.insert(0, os.path.join(REPO_ROOT, "payroll-parser-service", "api"))
+
+import fitz  # noqa: E402
+
+from index import parse_pdf_bytes as service_parse_pdf_bytes  # noqa: E402
+
+MODES = ("text", "layout")
+COMPARED_KEYS = ("month", "type", "details", "slips")
+
+
+def write_pages(path: str, pages: List[List[Tuple[float, float, str]]]) -> None:
+    with fitz.open() as document:
+        for lines in pages:
+            page = document.new_page()
+            for x, y, text in lines:
+                page.insert_text((x, y), text, fontname="japan", fontsize=10)
+        document.save(path)
+
+
+def column(lines: List[str], x: float = 72, top: float = 72) -> List[Tuple[float, float, str]]:
+    return [(x, top + index * 18, line) for index, line in enumerate(lines)]
+
+
+def build_corpus(workdir: str) -> List[str]:
+    paths = []
+
+    sample = os.path.join(workdir, "202603.pdf")
+    write_sample_pdf(sample)
+    paths.append(sample)
+
+    multi = os.path.join(workdir, "multi.pdf")
+    write_pages(
+        multi,
+        [
+            column(["2026年4月分 給与明細", "基本給: 300,000", "通勤手当 12,000"]),
+            column(["所得税:", "11,000", "住民税 20,000"]),
+            column(["2026年5月分 給与明細", "基本給: 305,000"]),
+        ],
+    )
+    paths.append(multi)
+
+    table = os.path.join(workdir, "table.pdf")
+    rows = [(60, 50, "2026年6月分 給与明細"), (60, 80, "支給"), (320, 80, "控除")]
+    for row in range(6):
+        y = 100 + row * 16
+        rows += [
+            (60, y, f"支給項目{row + 1}"),
+            (230, y, f"{(row + 1) * 1234:,}"),
+            (320, y, f"控除項目{row + 1}"),
+            (490, y, f"{(row + 1) * 321:,}"),
+        ]
+    write_pages(table, [rows])
+    paths.append(table)
+
+    full_width = os.path.join(workdir, "SYO202607.pdf")
+    write_pages(full_width, [column(["２０２６年７月分　賞与明細", "賞与：５００，０００", "所得税：　４５，０００"])])
+    paths.append(full_width)
+
+    empty = os.path.join(workdir, "empty.pdf")
+    write_pages(empty, [column(["支給", "控除", "備考"])])
+    paths.append(empty)
+
+    return paths
+
+
+def cli_parse(pdf_path: str, mode: str) -> Dict[str, Any]:
+    completed = subprocess.run(
+        [sys.executable, PARSER_SCRIPT, pdf_path, "--no-cache", "--snapshot", "none", "--mode", mode],
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def service_parse(pdf_path: str, mode: str) -> Dict[str, Any]:
+    with open(pdf_path, "rb") as file:
+        pdf_bytes = file.read()
+    try:
+        return service_parse_pdf_bytes(pdf_bytes, os.path.basename(pdf_path), mode)
+    except ValueError as error:
+        return {"error": str(error)}
+
+
+def compare(cli: Dict[str, Any], service: Dict[str, Any]) -> Optional[str]:
+    if "error" in cli or "error" in service:
+        if "error" in cli and "error" in service:
+            return None
+        return f"only one side failed: cli={cli.get('error')} service={service.get('error')}"
+    for key in COMPARED_KEYS:
+        if json.dumps(cli.get(key), ensure_ascii=False) != json.dumps(service.get(key), ensure_ascii=False):
+            return f"{key} differs\n    cli=     {cli.get(key)}\n    service= {service.get(key)}"
+    return None
+
+
+def run(pdf_paths: List[str]) -> int:
+    failures = 0
+    for pdf_path in pdf_paths:
+        for mode in MODES:
+            problem = compare(cli_parse(pdf_path, mode), service_parse(pdf_path, mode))
+            status = "ok" if problem is None else "MISMATCH"
+            print(f"{status:<9} {mode:<7} {os.path.basename(pdf_path)}")
+            if problem is not None:
+                failures += 1
+                print(f"  {problem}")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdf", nargs="+")
+    args = parser.parse_args()
+
+    if args.pdf:
+        failures = run(args.pdf)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            failures = run(build_corpus(workdir))
+
+    print("parity: " + ("OK" if not failures else f"{failures} mismatches"))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Throughput and tail latency of the self-hosted payroll parse server.
+
+Usage:
+    python benchmarks/payroll_service_load.py [--url http://host:port/api] [--requests 64]
+
+Without ``--url`` the script starts payroll-parser-service/serve.py on a free
+port (with the result cache disabled, so every request really parses) and
+drives it with 1, 4 and 16 concurrent clients.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from payroll_worker_bench import REPO_ROOT, percentile, write_sample_pdf  # noqa: E402
+
+SERVE_SCRIPT = os.path.join(REPO_ROOT, "payroll-parser-service", "serve.py")
+CONCURRENCY_LEVELS = [1, 4, 16]
+
+
+def post(url: str, body: bytes) -> Tuple[int, float]:
+    request = urllib.request.Request(
+        url,
+        data=body,
+        method="POST",
+        headers={"Content-Type": "application/pdf", "x-payroll-filename": "payroll.pdf"},
+    )
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    except (ConnectionError, urllib.error.URLError):
+        status = 0
+    return status, time.perf_counter() - started
+
+
+def run_level(url: str, body: bytes, concurrency: int, total: int) -> None:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: post(url, body), range(total)))
+    elapsed = time.perf_counter() - started
+
+    ok: List[float] = [latency for status, latency in results if status == 200]
+    rejected = sum(1 for status, _ in results if status == 503)
+    failed = len(results) - len(ok) - rejected
+    if not ok:
+        print(f"c={concurrency:<3} no successful requests (503={rejected}, failed={failed})")
+        return
+    print(
+        f"c={concurrency:<3} {len(ok) / elapsed:7.1f} req/s  "
+        f"p50={percentile(ok, 0.50) * 1000:7.1f} ms  "
+        f"p99={percentile(ok, 0.99) * 1000:7.1f} ms  "
+        f"mean={statistics.mean(ok) * 1000:7.1f} ms  503={rejected} failed={failed}"
+    )
+
+
+def start_server(extra_args: List[str]) -> Tuple[subprocess.Popen, str]:
+    env = dict(os.environ, PAYROLL_CACHE="off")
+    server = subprocess.Popen(
+        [sys.executable, SERVE_SCRIPT, "--port", "0", *extra_args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        env=env,
+    )
+    for line in server.stdout:
+        matched = re.search(r"listening on (http://\S+)", line)
+        if matched:
+            return server, f"{matched.group(1)}/api"
+    raise RuntimeError("payroll server did not start")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url")
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--pdf")
+    parser.add_argument("server_args", nargs=argparse.REMAINDER, help="extra serve.py arguments after --")
+    args = parser.parse_args()
+
+    if args.pdf:
+        with open(args.pdf, "rb") as file:
+            body = file.read()
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            pdf_path = os.path.join(workdir, "sample.pdf")
+            write_sample_pdf(pdf_path)
+            with open(pdf_path, "rb") as file:
+                body = file.read()
+
+    server = None
+    url = args.url
+    if not url:
+        server, url = start_server([arg for arg in args.server_args if arg != "--"])
+
+    try:
+        post(url, body)
+        for concurrency in CONCURRENCY_LEVELS:
+            run_level(url, body, concurrency, max(args.requests, concurrency))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
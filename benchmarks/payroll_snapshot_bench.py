@@ -0,0 +1,72 @@
+"""Time and payload size of each payroll snapshot policy.
+
+Usage:
+    python benchmarks/payroll_snapshot_bench.py [--runs 20] [--pdf path/to/slip.pdf]
+
+Every policy is measured in-process with parse_pdf_bytes, so the numbers are
+the parse cost alone; savings are reported against the ``png`` default.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "collectors"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from payroll_core import SNAPSHOT_PRESETS, parse_pdf_bytes  # noqa: E402
+from payroll_worker_bench import write_sample_pdf  # noqa: E402
+
+POLICY_ORDER = ["png", "jpeg", "webp", "thumbnail", "none"]
+
+
+def measure(pdf_bytes: bytes, policy, runs: int):
+    timings = []
+    payload = b""
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = parse_pdf_bytes(pdf_bytes, "payroll.pdf", policy)
+        payload = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), len(payload)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--pdf")
+    args = parser.parse_args()
+
+    if args.pdf:
+        with open(args.pdf, "rb") as file:
+            pdf_bytes = file.read()
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            pdf_path = os.path.join(workdir, "sample.pdf")
+            write_sample_pdf(pdf_path)
+            with open(pdf_path, "rb") as file:
+                pdf_bytes = file.read()
+
+    rows = []
+    for name in POLICY_ORDER:
+        try:
+            rows.append((name, *measure(pdf_bytes, SNAPSHOT_PRESETS[name], args.runs)))
+        except ImportError as error:
+            print(f"{name:<10} skipped ({error})")
+
+    baseline_time, baseline_bytes = next((t, b) for n, t, b in rows if n == "png")
+    print(f"{'policy':<10} {'p50 ms':>8} {'bytes':>9} {'time saved':>11} {'bytes saved':>12}")
+    for name, elapsed, size in rows:
+        print(
+            f"{name:<10} {elapsed * 1000:8.1f} {size:9d} "
+            f"{(1 - elapsed / baseline_time) * 100:10.1f}% {(1 - size / baseline_bytes) * 100:11.1f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Cold-spawn vs warm-worker latency for collectors/payroll_parser.py.
+
+Usage:
+    python benchmarks/payroll_worker_bench.py [--runs 30] [--pdf path/to/slip.pdf]
+
+Without ``--pdf`` a one-page synthetic slip is generated with PyMuPDF.
+Both the cold and the warm runs pass ``--no-cache``, so every request
+parses. ``warm-cached`` repeats the warm run against a throwaway result
+cache, showing cache-hit latency; it never touches ``~/.cache/flola``.
+"""
+
+import argparse
+import base64
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Sequence
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PARSER_SCRIPT = os.path.join(REPO_ROOT, "collectors", "payroll_parser.py")
+
+SAMPLE_LINES = [
+    "2026年3月分 給与明細",
+    "支給",
+    "基本給: 300,000",
+    "残業手当 45,000",
+    "控除",
+    "所得税:",
+    "12,340",
+    "健康保険 15,000",
+    "差引支給額 317,660",
+]
+
+
+def write_sample_pdf(path: str) -> None:
+    import fitz
+
+    with fitz.open() as document:
+        page = document.new_page()
+        for index, line in enumerate(SAMPLE_LINES):
+            page.insert_text((72, 72 + index * 18), line, fontname="japan", fontsize=11)
+        document.save(path)
+
+
+def percentile(samples: List[float], ratio: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(ratio * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name: str, samples: List[float]) -> None:
+    print(
+        f"{name:<12} n={len(samples):<4} "
+        f"p50={percentile(samples, 0.50) * 1000:8.1f} ms  "
+        f"p99={percentile(samples, 0.99) * 1000:8.1f} ms  "
+        f"mean={statistics.mean(samples) * 1000:8.1f} ms"
+    )
+
+
+def bench_cold(pdf_path: str, runs: int) -> List[float]:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, PARSER_SCRIPT, "--no-cache", pdf_path],
+            capture_output=True,
+            check=True,
+        )
+        samples.append(time.perf_counter() - started)
+        assert b'"details"' in completed.stdout, completed.stdout[:200]
+    return samples
+
+
+def bench_warm(pdf_path: str, runs: int, cache_args: Sequence[str] = ("--no-cache",)) -> List[float]:
+    with open(pdf_path, "rb") as file:
+        encoded = base64.b64encode(file.read()).decode("ascii")
+
+    worker = subprocess.Popen(
+        [sys.executable, PARSER_SCRIPT, "--serve", *cache_args],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        encoding="utf-8",
+    )
+
+    def read_message() -> dict:
+        while True:
+            line = worker.stdout.readline()
+            if not line:
+                raise RuntimeError("payroll worker exited")
+            try:
+                return json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+    try:
+        while not read_message().get("ready"):
+            pass
+
+        samples = []
+        for request_id in range(runs):
+            request = {"id": request_id, "filename": "payroll.pdf", "pdf": encoded}
+            started = time.perf_counter()
+            worker.stdin.write(json.dumps(request) + "\n")
+            worker.stdin.flush()
+            message = read_message()
+            samples.append(time.perf_counter() - started)
+            assert message["id"] == request_id and "details" in message["result"], message
+        return samples
+    finally:
+        worker.stdin.close()
+        worker.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--pdf")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        pdf_path = args.pdf
+        if not pdf_path:
+            pdf_path = os.path.join(workdir, "sample.pdf")
+            write_sample_pdf(pdf_path)
+
+        cold = bench_cold(pdf_path, args.runs)
+        warm = bench_warm(pdf_path, args.runs)
+        cached = bench_warm(pdf_path, args.runs, ("--cache", os.path.join(workdir, "cache.sqlite3")))
+
+    report("cold-spawn", cold)
+    report("warm-worker", warm)
+    report("warm-cached", cached)
+    print(f"speedup p50: {percentile(cold, 0.5) / percentile(warm, 0.5):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Offline end-to-end benchmark of the scrapers against recorded sessions.
+
+Usage:
+    python benchmarks/scraper_replay_bench.py [--target all|nomura|dc] [--runs 5] [--dir DIR]
+
+Record each target once with ``collectors/replay_harness.py record``. Every
+run then replays the HAR through the real scraper code on one shared
+Chromium, against a local mock Supabase. The report gives latency per run,
+the median of each phase from the run's timing metadata, and whether the
+extracted row matched the recording on every run.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "collectors"))
+
+from playwright.async_api import async_playwright  # noqa: E402
+
+from replay_harness import TARGETS, ReplayResult, ReplaySession, default_directory, manifest_path  # noqa: E402
+from scraper_browser import launch_browser  # noqa: E402
+
+
+def summarize(name: str, results: List[ReplayResult]) -> None:
+    seconds = [result.seconds for result in results]
+    matched = sum(result.ok for result in results)
+    print(f"{name:8s} runs {len(results)}  min {min(seconds):6.2f}s  median {statistics.median(seconds):6.2f}s  "
+          f"max {max(seconds):6.2f}s  correct {matched}/{len(results)}")
+
+    phases: Dict[str, List[int]] = {}
+    for result in results:
+        for phase, ms in result.phases.items():
+            phases.setdefault(phase, []).append(ms)
+    for phase, values in phases.items():
+        print(f"         {phase:20s} median {statistics.median(values):7.0f} ms")
+    for result in results:
+        if not result.ok:
+            print(f"         mismatch: {result.error or result.actual} (expected {result.expected})")
+
+
+async def bench(name: str, directory: str, runs: int) -> List[ReplayResult]:
+    with ReplaySession(name, directory) as session:
+        async with async_playwright() as playwright:
+            browser = await launch_browser(playwright)
+            try:
+                return [await session.run(browser) for _ in range(runs)]
+            finally:
+                await browser.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", choices=["all", *TARGETS], default="all")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--dir", default=default_directory())
+    args = parser.parse_args()
+
+    names = list(TARGETS) if args.target == "all" else [args.target]
+    failed = False
+    for name in names:
+        if not os.path.exists(manifest_path(args.dir, TARGETS[name].job_id)):
+            print(f"{name:8s} no recording in {args.dir}; run replay_harness.py record --target {name} first")
+            continue
+        results = asyncio.run(bench(name, args.dir, args.runs))
+        summarize(name, results)
+        failed = failed or not all(result.ok for result in results)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
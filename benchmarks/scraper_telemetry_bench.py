@@ -0,0 +1,100 @@
+"""Event-loop stall caused by scraper logging: direct .execute() vs TelemetrySink.
+
+Usage:
+    python benchmarks/scraper_telemetry_bench.py [--lines 20] [--latency-ms 50]
+
+A fake supabase client sleeps ``--latency-ms`` per request. While a coroutine
+logs ``--lines`` rows, a 5 ms ticker measures how late the event loop runs
+it; the sink run also reports how many requests reached the "server".
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "collectors"))
+
+from telemetry import TelemetrySink  # noqa: E402
+
+
+class FakeClient:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = 0
+        self.rows = 0
+
+    def table(self, name: str) -> "FakeClient":
+        return self
+
+    def insert(self, rows) -> "FakeClient":
+        self.rows += len(rows) if isinstance(rows, list) else 1
+        return self
+
+    def upsert(self, rows) -> "FakeClient":
+        return self
+
+    def execute(self) -> None:
+        self.requests += 1
+        time.sleep(self.latency)
+
+
+async def ticker(stop: asyncio.Event, lags: List[float], interval: float = 0.005) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def measure(log_line, lines: int) -> float:
+    stop = asyncio.Event()
+    lags: List[float] = []
+    task = asyncio.create_task(ticker(stop, lags))
+    await asyncio.sleep(0.02)
+    for index in range(lines):
+        await log_line(f"line {index}")
+        await asyncio.sleep(0)
+    stop.set()
+    await task
+    return max(lags) if lags else 0.0
+
+
+async def main_async(lines: int, latency: float) -> None:
+    direct = FakeClient(latency)
+
+    async def direct_log(message: str) -> None:
+        direct.table("system_logs").insert({"message": message}).execute()
+
+    started = time.perf_counter()
+    stall = await measure(direct_log, lines)
+    print(f"direct  worst loop stall {stall * 1000:7.1f} ms  total {(time.perf_counter() - started) * 1000:7.1f} ms  "
+          f"requests {direct.requests}")
+
+    buffered = FakeClient(latency)
+    sink = TelemetrySink(buffered, "bench", flush_interval=0.5)
+
+    async def sink_log(message: str) -> None:
+        sink.log("info", message)
+
+    started = time.perf_counter()
+    stall = await measure(sink_log, lines)
+    await sink.flush()
+    print(f"sink    worst loop stall {stall * 1000:7.1f} ms  total {(time.perf_counter() - started) * 1000:7.1f} ms  "
+          f"requests {buffered.requests} for {buffered.rows} rows")
+    sink.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.lines, args.latency_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
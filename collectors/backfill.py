@@ -0,0 +1,306 @@
+"""Backfill past monthly_balances rows from the portals' history pages.
+
+Usage:
+    python collectors/backfill.py --target nomura --from 2024-01 --to 2026-09 [--chunk-size 500] [--restart]
+
+Months that already have a monthly_balances row for the account are skipped
+without opening their page (one query up front). Every other month's page
+is read with one ``page.evaluate`` that returns the rows of the history
+table (found by its header labels). Rows are streamed into chunked bulk
+upserts on ``(record_date, account_id)``, and each finished month is
+written to a checkpoint, so an interrupted run continues where it stopped.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from playwright.async_api import Page
+
+DEFAULT_CHUNK_SIZE = 500
+# A backfill walks many pages in one session, so its wait deadline is far longer than a daily run's.
+BACKFILL_DEADLINE_SECONDS = float(os.getenv("SCRAPER_BACKFILL_DEADLINE_SECONDS", "3600"))
+
+# Returns [[date, amount, invested], ...] from the first table whose header has a date and an amount column.
+HISTORY_TABLE_SCRIPT = """
+  ({ dateLabels, amountLabels, investedLabels }) => {
+    const textOf = (element) => ((element && element.textContent) || '').replace(/\\s+/g, ' ').trim()
+    const findColumn = (headers, labels) => headers.findIndex((header) => labels.some((label) => header.includes(label)))
+
+    for (const table of document.querySelectorAll('table')) {
+      const headerRow = table.querySelector('thead tr') || table.querySelector('tr')
+      if (!headerRow) continue
+      const headers = Array.from(headerRow.children, textOf)
+      const dateColumn = findColumn(headers, dateLabels)
+      const amountColumn = findColumn(headers, amountLabels)
+      if (dateColumn < 0 || amountColumn < 0) continue
+      const investedColumn = investedLabels.length ? findColumn(headers, investedLabels) : -1
+
+      const rows = []
+      for (const row of table.querySelectorAll('tr')) {
+        if (row === headerRow) continue
+        const cells = Array.from(row.children, textOf)
+        if (cells.length <= Math.max(dateColumn, amountColumn)) continue
+        rows.push([cells[dateColumn], cells[amountColumn], investedColumn >= 0 ? cells[investedColumn] || '' : ''])
+      }
+      return rows
+    }
+    return []
+  }
+"""
+
+DATE_PATTERN = re.compile(r"(20\d{2})\s*[年/.\-]\s*([01]?\d)(?:\s*[月/.\-]\s*([0-3]?\d))?")
+
+
+@dataclass(frozen=True)
+class HistoryTableSpec:
+    amount_labels: Tuple[str, ...]
+    invested_labels: Tuple[str, ...] = ()
+    date_labels: Tuple[str, ...] = ("基準日", "評価日", "日付", "年月")
+
+    def as_js(self) -> Dict[str, List[str]]:
+        return {
+            "dateLabels": list(self.date_labels),
+            "amountLabels": list(self.amount_labels),
+            "investedLabels": list(self.invested_labels),
+        }
+
+
+@dataclass
+class BackfillStats:
+    months_total: int = 0
+    months_skipped: int = 0
+    months_read: int = 0
+    rows_read: int = 0
+    rows_written: int = 0
+    upserts: int = 0
+    resumed_from: Optional[str] = None
+    empty_months: List[str] = field(default_factory=list)
+
+    def as_metadata(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+def parse_month(value: str) -> datetime.date:
+    return datetime.datetime.strptime(value, "%Y-%m").date()
+
+
+def month_key(month: datetime.date) -> str:
+    return month.strftime("%Y-%m")
+
+
+def next_month(month: datetime.date) -> datetime.date:
+    return datetime.date(month.year + 1, 1, 1) if month.month == 12 else datetime.date(month.year, month.month + 1, 1)
+
+
+def iter_months(start: datetime.date, end: datetime.date) -> List[datetime.date]:
+    months = []
+    month = start.replace(day=1)
+    while month <= end:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def parse_history_date(text: str) -> Optional[str]:
+    """``2025年1月31日`` / ``2025/01/31`` / ``2025-01-31``; a month without a day maps to the 1st."""
+    match = DATE_PATTERN.search(text or "")
+    if not match:
+        return None
+    year, month, day = int(match.group(1)), int(match.group(2)), int(match.group(3) or 1)
+    try:
+        return datetime.date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+class Checkpoint:
+    """Months already backfilled for one job and range, kept in a small JSON file."""
+
+    def __init__(self, job_id: str, start: datetime.date, end: datetime.date, directory: Optional[str] = None):
+        directory = directory or os.getenv("SCRAPER_BACKFILL_DIR") or os.path.join(
+            os.path.expanduser("~"), ".cache", "flola", "backfill"
+        )
+        self.path = os.path.join(directory, f"{job_id}.json")
+        self.range = f"{month_key(start)}..{month_key(end)}"
+        self.done: Set[str] = set()
+
+    def load(self) -> Set[str]:
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                saved = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return self.done
+        if saved.get("range") == self.range:
+            self.done = set(saved.get("done", []))
+        return self.done
+
+    def mark(self, months: List[datetime.date]) -> None:
+        if not months:
+            return
+        self.done.update(month_key(month) for month in months)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"range": self.range, "done": sorted(self.done)}, file)
+        os.replace(temp_path, self.path)
+
+    def clear(self) -> None:
+        self.done = set()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class ChunkedUpserter:
+    """Collects monthly_balances rows and upserts them off the event loop, in chunks of whole months.
+
+    A chunk is flushed by ``end_month`` once it holds at least ``chunk_size`` rows, never halfway
+    through a month: a resumed run skips every month that has any stored row (``covered_months``),
+    so a month whose rows were only partly written would never be completed.
+    """
+
+    def __init__(
+        self,
+        client,
+        stats: BackfillStats,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        on_flush: Optional[Callable[[], None]] = None,
+    ):
+        self.client = client
+        self.stats = stats
+        self.chunk_size = chunk_size
+        self.on_flush = on_flush
+        # Keyed on the conflict target: a repeated date within one chunk would fail the upsert.
+        self._pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self._pending[(row["record_date"], row["account_id"])] = row
+
+    async def end_month(self) -> None:
+        """Call after a month's last row: flush if the chunk is full, or checkpoint right away if nothing is pending."""
+        if len(self._pending) >= self.chunk_size:
+            await self.flush()
+        elif not self._pending and self.on_flush is not None:
+            self.on_flush()
+
+    async def flush(self) -> None:
+        if self._pending:
+            rows = list(self._pending.values())
+            self._pending = {}
+            await asyncio.get_running_loop().run_in_executor(None, self._upsert, rows)
+            self.stats.rows_written += len(rows)
+            self.stats.upserts += 1
+        if self.on_flush is not None:
+            self.on_flush()
+
+    def _upsert(self, rows: List[Dict[str, Any]]) -> None:
+        self.client.table("monthly_balances").upsert(rows, on_conflict="record_date, account_id").execute()
+
+
+def covered_months(client, account_id: str, start: datetime.date, end: datetime.date) -> Set[str]:
+    """Months in [start, end] that already have at least one monthly_balances row."""
+    response = (
+        client.table("monthly_balances")
+        .select("record_date")
+        .eq("account_id", account_id)
+        .gte("record_date", start.isoformat())
+        .lt("record_date", next_month(end).isoformat())
+        .execute()
+    )
+    return {str(row["record_date"])[:7] for row in response.data or []}
+
+
+async def read_history_rows(page: Page, spec: HistoryTableSpec) -> List[List[str]]:
+    return await page.evaluate(HISTORY_TABLE_SCRIPT, spec.as_js())
+
+
+async def run_backfill(
+    client,
+    account_id: str,
+    start: datetime.date,
+    end: datetime.date,
+    checkpoint: Checkpoint,
+    open_month: Callable[[datetime.date], Awaitable[Page]],
+    spec: HistoryTableSpec,
+    to_amount: Callable[[Optional[str]], int],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> BackfillStats:
+    """Walk [start, end] month by month; ``open_month`` navigates to a month's history page and returns it."""
+    months = iter_months(start, end)
+    stats = BackfillStats(months_total=len(months))
+    done = checkpoint.load()
+    if done:
+        stats.resumed_from = max(done)
+    covered = await asyncio.get_running_loop().run_in_executor(None, covered_months, client, account_id, start, end)
+    range_end = next_month(end).isoformat()
+
+    # A month is checkpointed only once every row read from it has been upserted.
+    finished: List[datetime.date] = []
+
+    def checkpoint_finished() -> None:
+        checkpoint.mark(finished)
+        finished.clear()
+
+    upserter = ChunkedUpserter(client, stats, chunk_size, on_flush=checkpoint_finished)
+
+    for month in months:
+        key = month_key(month)
+        if key in done or key in covered:
+            stats.months_skipped += 1
+            continue
+
+        page = await open_month(month)
+        rows = await read_history_rows(page, spec)
+        stats.months_read += 1
+        if not rows:
+            stats.empty_months.append(key)
+
+        for date_text, amount_text, invested_text in rows:
+            record_date = parse_history_date(date_text)
+            amount = to_amount(amount_text)
+            if record_date is None or amount <= 0 or not start.isoformat() <= record_date < range_end:
+                continue
+            stats.rows_read += 1
+            upserter.add(
+                {
+                    "record_date": record_date,
+                    "account_id": account_id,
+                    "amount": amount,
+                    "invested_amount": to_amount(invested_text) or None,
+                }
+            )
+
+        finished.append(month)
+        await upserter.end_month()
+
+    await upserter.flush()
+    return stats
+
+
+def main() -> None:
+    # The engine imports this module, so it is only imported once the CLI runs.
+    from collector_engine import COLLECTORS, backfill_collector, load_collector
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", choices=list(COLLECTORS), required=True)
+    parser.add_argument("--from", dest="start", type=parse_month, required=True, help="first month, YYYY-MM")
+    parser.add_argument("--to", dest="end", type=parse_month, required=True, help="last month, YYYY-MM")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint of a previous run")
+    args = parser.parse_args()
+    if args.start > args.end:
+        parser.error("--from must not be after --to")
+
+    collector = load_collector(args.target)
+    asyncio.run(backfill_collector(collector, args.start, args.end, chunk_size=args.chunk_size, restart=args.restart))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,430 @@
+"""Shared engine that runs every institution collector.
+
+An institution is a ``Collector`` plugin. It provides its settings, its
+context options and blocking policy, an extraction spec (``balance_fields``
+must define ``market_value``, ``invested_value`` and ``record_date``), and
+two page steps:
+
+* ``authenticate`` logs in, or resumes the saved session, on a fresh page.
+  The URL the login landed on is saved with the session, and a resumed
+  session is checked there (``resume_url``).
+* ``open_balance`` navigates the logged-in page to where the balance is
+  shown. It is retried with backoff, and attempt 2+ must start from a
+  known URL, such as ``landing_url`` (where ``authenticate`` left the page).
+* ``read_valuation`` (optional) reads the valuation date, and whatever else
+  is cheap, from the page ``authenticate`` left open.
+
+The portals only revalue on valuation days, so most runs find what is
+already stored. The account's newest monthly_balances row is fetched with
+the account lookup. When the valuation date read early (plus the amounts,
+if they were read too) matches it, the run stops before ``open_balance``.
+Otherwise a full read that equals the stored row skips the upsert. Either
+way the job ends with status ``skipped_unchanged``.
+
+Everything else is done here, the same way for every institution: status
+and log rows, the account lookup, session reuse, resource blocking, phase
+timing, retries, the monthly_balances upsert and backfills. Runs against
+the same host are limited to ``SCRAPER_MAX_PER_HOST`` at a time (default
+1), so collectors can run in parallel on one browser without two of them
+logging in to the same portal at once.
+
+To add an institution, write a module with a ``COLLECTOR`` instance and
+register it in ``COLLECTORS``. Its ``cadence`` tells scheduler.py when to
+run it.
+"""
+
+import asyncio
+import datetime
+import importlib
+import os
+import traceback
+import weakref
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from playwright.async_api import Browser, BrowserContext, Page
+
+from backfill import (
+    BACKFILL_DEADLINE_SECONDS,
+    DEFAULT_CHUNK_SIZE,
+    BackfillStats,
+    Checkpoint,
+    HistoryTableSpec,
+    month_key,
+    run_backfill,
+)
+from extraction_spec import ExtractedField, FieldSpec, describe_strategies, extract_fields
+from phase_timer import PhaseTimer
+from resource_blocking import BlockingPolicy, install_resource_blocking
+from retry_policy import Retrier
+from scraper_browser import new_context, use_browser
+from scraper_config import get_session_store, get_supabase, get_telemetry
+from session_store import SessionStore
+from value_parsers import parse_amount
+from wait_engine import WaitEngine, WaitSignal, success
+
+COLLECTORS: Dict[str, str] = {
+    "nomura": "nomura_scraper",
+    "dc": "dc_scraper",
+}
+
+
+@dataclass(frozen=True)
+class Cadence:
+    """When scheduler.py runs a collector: at ``at`` Tokyo time on ``weekdays`` (Monday is 0)."""
+
+    at: datetime.time
+    weekdays: Tuple[int, ...] = (0, 1, 2, 3, 4)
+    # Each day's run starts up to this many minutes late, so the portals never see a run on the minute.
+    jitter_minutes: float = 20.0
+
+
+@dataclass(frozen=True)
+class CollectorSettings:
+    """Settings every collector has; plugins subclass it with their credentials."""
+
+    account_name: str
+    # First page a run opens; its host is the key of the per-host concurrency limit.
+    start_url: str
+    deadline_seconds: float
+    # Monthly history page for backfills, formatted with year and month, e.g. "...?ym={year}{month:02d}".
+    history_url: Optional[str]
+
+
+class Collector:
+    job_id: str = ""
+    title: str = ""
+    balance_fields: Tuple[FieldSpec, ...] = ()
+    blocking_policy: BlockingPolicy = BlockingPolicy()
+    context_options: Dict[str, Any] = {}
+    history_table: Optional[HistoryTableSpec] = None
+    # Failure signals raced on every backfill history page, e.g. being sent back to the login form.
+    session_lost: Tuple[WaitSignal, ...] = ()
+    cadence: Cadence = Cadence(datetime.time(8, 0))
+
+    def settings(self) -> CollectorSettings:
+        """Read and validate the settings; raises ValueError when a required variable is missing."""
+        raise NotImplementedError
+
+    async def authenticate(self, page: Page, waits: WaitEngine, resume_url: Optional[str]) -> bool:
+        """Log in on a fresh page; True when the saved session, checked on ``resume_url``, was reused instead."""
+        raise NotImplementedError
+
+    async def open_balance(
+        self, page: Page, waits: WaitEngine, attempt: int, landing_url: str
+    ) -> Optional[Dict[str, Any]]:
+        """Navigate to the balance; the returned details go into the navigation phase's timing."""
+        raise NotImplementedError
+
+    async def read_valuation(self, page: Page, waits: WaitEngine) -> Optional[Dict[str, ExtractedField]]:
+        """Fields readable before ``open_balance``, ``record_date`` among them; None when there is no such page."""
+        return None
+
+    def host(self) -> str:
+        return urlsplit(self.settings().start_url).hostname or self.job_id
+
+
+def load_collector(name: str) -> Collector:
+    return importlib.import_module(COLLECTORS[name]).COLLECTOR
+
+
+class HostLimits:
+    """One semaphore per host and event loop, so a shared browser never runs two sessions on one portal."""
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @asynccontextmanager
+    async def slot(self, host: str) -> AsyncIterator[None]:
+        limit = self.limit or int(os.getenv("SCRAPER_MAX_PER_HOST", "1"))
+        semaphores = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        semaphore = semaphores.setdefault(host, asyncio.Semaphore(limit))
+        async with semaphore:
+            yield
+
+
+host_limits = HostLimits()
+
+
+def lookup_account_id(account_name: str) -> str:
+    response = get_supabase().table("accounts").select("id").eq("name", account_name).single().execute()
+    if not response.data:
+        raise RuntimeError(f"Account '{account_name}' not found.")
+    return response.data["id"]
+
+
+def latest_balance(account_id: str) -> Optional[Dict[str, Any]]:
+    """The account's newest monthly_balances row as {record_date, amount, invested_amount}, or None."""
+    response = (
+        get_supabase()
+        .table("monthly_balances")
+        .select("record_date, amount, invested_amount")
+        .eq("account_id", account_id)
+        .order("record_date", desc=True)
+        .limit(1)
+        .execute()
+    )
+    return response.data[0] if response.data else None
+
+
+def load_session(
+    session_store: Optional[SessionStore], collector: Collector
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """The saved storage_state and the URL to resume it on; (None, None) when there is no session."""
+    state = session_store.load(collector.job_id) if session_store else None
+    if state is None:
+        return None, None
+    # Sessions saved before the landing URL was kept are checked on start_url, as they used to be.
+    return state, state.pop("landing_url", None) or collector.settings().start_url
+
+
+async def save_session(
+    session_store: Optional[SessionStore], collector: Collector, context: BrowserContext, landing_url: str
+) -> None:
+    if session_store:
+        session_store.save(collector.job_id, {**await context.storage_state(), "landing_url": landing_url})
+
+
+def unchanged_since(latest: Optional[Dict[str, Any]], extracted: Optional[Dict[str, ExtractedField]]) -> bool:
+    """True when the valuation date was found and it, and every amount that was found, matches ``latest``."""
+    if latest is None or extracted is None:
+        return False
+    record_date = extracted.get("record_date")
+    if record_date is None or record_date.strategy is None or record_date.value != latest["record_date"]:
+        return False
+    for name, column in (("market_value", "amount"), ("invested_value", "invested_amount")):
+        field = extracted.get(name)
+        if field is not None and field.strategy is not None and field.value != latest[column]:
+            return False
+    return True
+
+
+async def read_balance(
+    collector: Collector,
+    page: Page,
+    waits: WaitEngine,
+    timer: PhaseTimer,
+    attempt: int,
+    landing_url: str,
+) -> Dict[str, ExtractedField]:
+    with timer.phase("navigation", attempt=attempt) as span:
+        span.args.update(await collector.open_balance(page, waits, attempt, landing_url) or {})
+
+    with timer.phase("extract", attempt=attempt) as span:
+        extracted = await extract_fields(page, collector.balance_fields)
+        span.args["strategies"] = describe_strategies(extracted)
+    return extracted
+
+
+async def run_collector(collector: Collector, browser: Optional[Browser] = None) -> str:
+    """One scheduled run: read today's balance and upsert it into monthly_balances; returns the job status."""
+    settings = collector.settings()
+    session_store = get_session_store()
+    telemetry = get_telemetry(collector.job_id)
+    telemetry.log("info", f"{collector.title} scraper started.")
+    telemetry.status("running")
+    waits: Optional[WaitEngine] = None
+    retrier: Optional[Retrier] = None
+    timer = PhaseTimer(collector.job_id)
+
+    try:
+        with timer.phase("account_lookup"):
+            account_id = lookup_account_id(settings.account_name)
+            latest = latest_balance(account_id)
+        saved_state, resume_url = load_session(session_store, collector)
+
+        slot_wait = timer.begin("host_slot")
+        async with host_limits.slot(collector.host()):
+            timer.end(slot_wait)
+            launch = timer.begin("browser", shared=browser is not None)
+            async with use_browser(browser) as browser:
+                context = await new_context(
+                    browser, collector.job_id, storage_state=saved_state, **collector.context_options
+                )
+                try:
+                    blocking_stats = await install_resource_blocking(context, collector.blocking_policy)
+                    page = await context.new_page()
+                    timer.end(launch)
+                    timer.watch_network(blocking_stats)
+                    waits = WaitEngine(page, settings.deadline_seconds)
+                    retrier = Retrier(remaining=waits.remaining)
+
+                    with timer.phase("login") as span:
+                        session_reused = await collector.authenticate(page, waits, resume_url)
+                        span.args["session_reused"] = session_reused
+                    if session_reused:
+                        telemetry.log("info", "Reused saved login session.")
+                    landing_url = page.url
+
+                    unchanged = False
+                    if latest is not None:
+                        with timer.phase("valuation_check") as span:
+                            unchanged = unchanged_since(latest, await collector.read_valuation(page, waits))
+                            span.args["unchanged"] = unchanged
+
+                    if unchanged:
+                        record_date = latest["record_date"]
+                        market_value = latest["amount"]
+                        invested_value = latest["invested_amount"]
+                    else:
+                        # A timeout or an empty value is retried on the same logged-in page instead of failing the run.
+                        extracted = await retrier.call(
+                            "balance",
+                            lambda attempt: read_balance(collector, page, waits, timer, attempt, landing_url),
+                            retry_if=lambda extracted: extracted["market_value"].value <= 0,
+                        )
+                        strategies = describe_strategies(extracted)
+                        market_value = extracted["market_value"].value
+                        invested_value = extracted["invested_value"].value or None
+                        record_date = extracted["record_date"].value
+                        telemetry.log(
+                            "info",
+                            f"Found market value {market_value} and invested value {invested_value}.",
+                            {"strategies": strategies},
+                        )
+
+                        if market_value <= 0:
+                            debug_metadata = {
+                                "url": page.url,
+                                "title": await page.title(),
+                                "strategies": strategies,
+                            }
+                            telemetry.log("error", "Market value could not be extracted.", debug_metadata)
+                            raise RuntimeError("Market value is 0.")
+
+                    row = {
+                        "record_date": record_date,
+                        "account_id": account_id,
+                        "amount": market_value,
+                        "invested_amount": invested_value,
+                    }
+                    balance = {key: row[key] for key in ("record_date", "amount", "invested_amount")}
+                    unchanged = unchanged or latest == balance
+
+                    await save_session(session_store, collector, context, landing_url)
+
+                    if not unchanged:
+                        with timer.phase("db_upsert"):
+                            get_supabase().table("monthly_balances").upsert(
+                                row, on_conflict="record_date, account_id"
+                            ).execute()
+                finally:
+                    # The browser may be shared and outlive this run, so a failed run must not leave its context open.
+                    await context.close()
+
+        if unchanged:
+            status = "skipped_unchanged"
+            success_message = f"Unchanged since last run: {market_value:,} JPY (Date: {record_date})"
+        else:
+            status = "success"
+            success_message = f"Saved to DB: {market_value:,} JPY (Date: {record_date}, Invested: {invested_value})"
+        print(f"[INFO] Network: {blocking_stats.summary()}")
+        telemetry.log(
+            "info",
+            success_message,
+            {
+                "resource_blocking": blocking_stats.as_metadata(),
+                "waits": waits.history,
+                "timing": timer.as_metadata(),
+                "retries": retrier.as_metadata(),
+            },
+        )
+        telemetry.status(status, success_message)
+        return status
+    except Exception as error:
+        if session_store:
+            # A stale session can look valid on the home page and still fail later; start fresh next run.
+            session_store.discard(collector.job_id)
+        error_message = f"Failed: {error}"
+        telemetry.log(
+            "error",
+            error_message,
+            {
+                "trace": traceback.format_exc(),
+                "waits": waits.history if waits else [],
+                "timing": timer.as_metadata(),
+                "retries": retrier.as_metadata() if retrier else {},
+            },
+        )
+        telemetry.status("failed", error_message)
+        raise
+    finally:
+        timer.write_trace()
+        await telemetry.flush()
+
+
+async def backfill_collector(
+    collector: Collector,
+    start: datetime.date,
+    end: datetime.date,
+    browser: Optional[Browser] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    restart: bool = False,
+) -> BackfillStats:
+    """Write the monthly_balances rows of [start, end] from the history pages; see backfill.py."""
+    settings = collector.settings()
+    history_url = settings.history_url
+    if not history_url or collector.history_table is None:
+        raise ValueError(f"{collector.title} has no history page configured for backfills.")
+    session_store = get_session_store()
+    telemetry = get_telemetry(collector.job_id)
+    checkpoint = Checkpoint(collector.job_id, start, end)
+    if restart:
+        checkpoint.clear()
+    telemetry.log("info", f"{collector.title} backfill {month_key(start)}..{month_key(end)} started.")
+
+    try:
+        account_id = lookup_account_id(settings.account_name)
+        saved_state, resume_url = load_session(session_store, collector)
+
+        async with host_limits.slot(collector.host()), use_browser(browser) as browser:
+            context = await new_context(
+                browser, collector.job_id, storage_state=saved_state, **collector.context_options
+            )
+            try:
+                await install_resource_blocking(context, collector.blocking_policy)
+                page = await context.new_page()
+                waits = WaitEngine(page, BACKFILL_DEADLINE_SECONDS)
+                await collector.authenticate(page, waits, resume_url)
+                landing_url = page.url
+
+                async def open_month(month: datetime.date) -> Page:
+                    url = history_url.format(year=month.year, month=month.month)
+                    await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+                    signals = [success("history_table", "table"), *collector.session_lost]
+                    await waits.race(f"history {month_key(month)}", signals, raise_on_timeout=False)
+                    return page
+
+                stats = await run_backfill(
+                    get_supabase(),
+                    account_id,
+                    start,
+                    end,
+                    checkpoint,
+                    open_month,
+                    collector.history_table,
+                    parse_amount,
+                    chunk_size,
+                )
+                await save_session(session_store, collector, context, landing_url)
+            finally:
+                await context.close()
+
+        telemetry.log(
+            "info",
+            f"Backfill saved {stats.rows_written} rows from {stats.months_read} months "
+            f"({stats.months_skipped} already present).",
+            {"backfill": stats.as_metadata()},
+        )
+        return stats
+    except Exception as error:
+        telemetry.log("error", f"Backfill failed: {error}", {"trace": traceback.format_exc()})
+        raise
+    finally:
+        await telemetry.flush()
+
@@ -0,0 +1,118 @@
+"""Declarative field extraction done in a single ``page.evaluate`` round trip.
+
+Each ``FieldSpec`` lists CSS selectors to try first and labels to fall back
+on. The page script reads ``textContent`` (no layout is forced) and walks
+the text nodes once with a TreeWalker to find every label, skipping the
+contents of ``script``, ``style``, ``noscript`` and ``template``, then returns
+all candidate texts per field in priority order. Python applies the field's
+normalizer and keeps the first candidate it accepts, recording which
+strategy produced it.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from playwright.async_api import Page
+
+# Where to look for the value relative to the element holding a label, in order.
+DEFAULT_LABEL_TARGETS = ("next", "parent_next", "row_last_cell", "box_number")
+
+EXTRACT_SCRIPT = """
+  (fields) => {
+    const textOf = (element) => ((element && element.textContent) || '').replace(/\\s+/g, ' ').trim()
+    const query = (selector) => {
+      try {
+        return document.querySelector(selector)
+      } catch (error) {
+        return null
+      }
+    }
+
+    const labels = [...new Set(fields.flatMap((field) => field.labels))]
+    const labelElements = new Map()
+    // Inline JS and JSON often repeat the labels; only text that can be rendered is matched.
+    const unrendered = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE'])
+    const acceptNode = (node) =>
+      unrendered.has(node.parentElement?.tagName) ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT
+    if (labels.length && document.body) {
+      const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT, { acceptNode })
+      for (let node = walker.nextNode(); node && labelElements.size < labels.length; node = walker.nextNode()) {
+        for (const label of labels) {
+          if (!labelElements.has(label) && node.data.includes(label)) labelElements.set(label, node.parentElement)
+        }
+      }
+    }
+
+    const targets = {
+      next: (element) => element.nextElementSibling,
+      parent_next: (element) => element.parentElement?.nextElementSibling,
+      row_last_cell: (element) => element.closest('tr')?.querySelector('td:last-child'),
+      box_number: (element) => element.closest('.financialStatus_box')?.querySelector('.number'),
+    }
+
+    const result = {}
+    for (const field of fields) {
+      const candidates = []
+      for (const selector of field.selectors) {
+        const text = textOf(query(selector))
+        if (text) candidates.push({ strategy: `selector ${selector}`, text })
+      }
+      for (const label of field.labels) {
+        const element = labelElements.get(label)
+        if (!element) continue
+        for (const target of field.labelTargets) {
+          const text = textOf(targets[target](element))
+          if (text) {
+            candidates.push({ strategy: `label ${label} (${target})`, text })
+            break
+          }
+        }
+      }
+      result[field.name] = candidates
+    }
+    return result
+  }
+"""
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    name: str
+    normalize: Callable[[Optional[str]], Any]
+    selectors: Tuple[str, ...] = ()
+    labels: Tuple[str, ...] = ()
+    label_targets: Tuple[str, ...] = DEFAULT_LABEL_TARGETS
+    accept: Callable[[Any], bool] = bool
+
+    def as_js(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "selectors": list(self.selectors),
+            "labels": list(self.labels),
+            "labelTargets": list(self.label_targets),
+        }
+
+
+@dataclass
+class ExtractedField:
+    value: Any
+    strategy: Optional[str] = None
+    raw: Optional[str] = None
+
+
+def pick(field: FieldSpec, candidates: List[Dict[str, str]]) -> ExtractedField:
+    for candidate in candidates:
+        value = field.normalize(candidate["text"])
+        if field.accept(value):
+            return ExtractedField(value, candidate["strategy"], candidate["text"])
+    return ExtractedField(field.normalize(None))
+
+
+async def extract_fields(page: Page, fields: Sequence[FieldSpec]) -> Dict[str, ExtractedField]:
+    """Extract every field of ``fields`` from the current page in one round trip."""
+    candidates = await page.evaluate(EXTRACT_SCRIPT, [field.as_js() for field in fields])
+    return {field.name: pick(field, candidates.get(field.name, [])) for field in fields}
+
+
+def describe_strategies(extracted: Dict[str, ExtractedField]) -> Dict[str, Optional[str]]:
+    return {name: field.strategy for name, field in extracted.items()}
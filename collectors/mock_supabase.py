@@ -0,0 +1,189 @@
+"""Local stand-in for the Supabase REST API the collectors use.
+
+Serves the PostgREST subset that supabase-py issues from the scrapers and
+the telemetry sink: ``GET /rest/v1/<table>`` with ``eq``/``gte``/``lte``/
+``gt``/``lt`` filters, ``select``, ``order``, ``limit`` and the single-object
+``Accept`` header, and ``POST /rest/v1/<table>`` for inserts and
+``resolution=merge-duplicates`` upserts. Rows live in memory. An account
+looked up by name is created on first use, so a scraper never needs seeding.
+
+    with MockSupabase() as mock:
+        os.environ["SUPABASE_URL"] = mock.url
+        ...
+        mock.rows("monthly_balances")
+"""
+
+import json
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+# Conflict target of an upsert that does not pass on_conflict (the table's primary key).
+PRIMARY_KEYS: Dict[str, Tuple[str, ...]] = {
+    "accounts": ("id",),
+    "job_status": ("job_id",),
+    "monthly_balances": ("record_date", "account_id"),
+}
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+SINGLE_OBJECT = "application/vnd.pgrst.object+json"
+
+
+@dataclass
+class RequestRecord:
+    method: str
+    table: str
+    seconds: float
+    status: int
+
+
+def matches(row: Dict[str, Any], column: str, condition: str) -> bool:
+    operator, _, expected = condition.partition(".")
+    value = row.get(column)
+    if operator == "eq":
+        return str(value) == expected
+    if operator == "neq":
+        return str(value) != expected
+    if value is None:
+        return False
+    compare = {"gt": str.__gt__, "gte": str.__ge__, "lt": str.__lt__, "lte": str.__le__}.get(operator)
+    return bool(compare and compare(str(value), expected))
+
+
+class MockSupabase:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.requests: List[RequestRecord] = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "MockSupabase":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-supabase", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [dict(row) for row in self.tables.get(table, [])]
+
+    def reset(self, *tables: str) -> None:
+        with self.lock:
+            for table in tables or list(self.tables):
+                self.tables.pop(table, None)
+            self.requests.clear()
+
+    def select(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        with self.lock:
+            rows = self.tables.get(table, [])
+            filters = [(column, condition) for column, condition in params if column not in RESERVED_PARAMS]
+            if table == "accounts" and not any(matches(row, c, v) for row in rows for c, v in filters):
+                rows = self._create_account(filters)
+            selected = [row for row in rows if all(matches(row, c, v) for c, v in filters)]
+
+        options = dict(params)
+        if "order" in options:
+            column, _, direction = options["order"].partition(".")
+            selected.sort(key=lambda row: str(row.get(column)), reverse=direction.startswith("desc"))
+        if "limit" in options:
+            selected = selected[: int(options["limit"])]
+        columns = [column.strip() for column in options.get("select", "*").split(",")]
+        if columns != ["*"]:
+            selected = [{column: row.get(column) for column in columns} for row in selected]
+        return selected
+
+    def write(self, table: str, body: Any, params: Dict[str, str], upsert: bool) -> List[Dict[str, Any]]:
+        rows = body if isinstance(body, list) else [body]
+        keys = tuple(column.strip() for column in params["on_conflict"].split(",")) if "on_conflict" in params else (
+            PRIMARY_KEYS.get(table, ())
+        )
+        with self.lock:
+            stored = self.tables.setdefault(table, [])
+            for row in rows:
+                existing = None
+                if upsert and keys:
+                    existing = next((old for old in stored if all(old.get(k) == row.get(k) for k in keys)), None)
+                if existing is not None:
+                    existing.update(row)
+                else:
+                    stored.append(dict(row))
+        return rows
+
+    def _create_account(self, filters: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        names = [condition[3:] for column, condition in filters if column == "name" and condition.startswith("eq.")]
+        if not names:
+            return self.tables.get("accounts", [])
+        account = {"id": str(uuid.uuid4()), "name": names[0]}
+        self.tables.setdefault("accounts", []).append(account)
+        return self.tables["accounts"]
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+            def _table(self) -> Optional[str]:
+                path = urlsplit(self.path).path
+                prefix = "/rest/v1/"
+                return path[len(prefix):] if path.startswith(prefix) else None
+
+            def _reply(self, status: int, payload: Any, started: float, table: str) -> None:
+                body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with mock.lock:
+                    mock.requests.append(RequestRecord(self.command, table, time.perf_counter() - started, status))
+
+            def do_GET(self) -> None:
+                started = time.perf_counter()
+                table = self._table()
+                if table is None:
+                    self._reply(404, {"message": "not found"}, started, "")
+                    return
+                rows = mock.select(table, parse_qsl(urlsplit(self.path).query))
+                if SINGLE_OBJECT in self.headers.get("Accept", ""):
+                    if len(rows) != 1:
+                        self._reply(406, {"code": "PGRST116", "message": f"{len(rows)} rows"}, started, table)
+                        return
+                    self._reply(200, rows[0], started, table)
+                    return
+                self._reply(200, rows, started, table)
+
+            def do_POST(self) -> None:
+                started = time.perf_counter()
+                table = self._table()
+                if table is None:
+                    self._reply(404, {"message": "not found"}, started, "")
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"null")
+                prefer = self.headers.get("Prefer", "")
+                rows = mock.write(
+                    table,
+                    body,
+                    dict(parse_qsl(urlsplit(self.path).query)),
+                    upsert="resolution=merge-duplicates" in prefer,
+                )
+                self._reply(201, rows if "return=representation" in prefer else [], started, table)
+
+        return Handler
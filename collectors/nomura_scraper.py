@@ -1,23 +1,20 @@
 import asyncio
 import datetime
-import os
-import re
-import traceback
-from typing import Optional
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Optional
 
-from dotenv import load_dotenv
-from playwright.async_api import Page, async_playwright
-from supabase import Client, create_client
+from playwright.async_api import Browser, Page
 
-load_dotenv()
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-NOMURA_LOGIN_ID = os.getenv("NOMURA_LOGIN_ID")
-NOMURA_PASSWORD = os.getenv("NOMURA_PASSWORD")
-NOMURA_ACCOUNT_NAME = os.getenv("NOMURA_ACCOUNT_NAME", "野村持ち株会")
-NOMURA_LOGIN_URL = os.getenv("NOMURA_LOGIN_URL", "https://www.e-plan.nomura.co.jp/login/index.html")
+from backfill import DEFAULT_CHUNK_SIZE, BackfillStats, HistoryTableSpec
+from collector_engine import Cadence, Collector, CollectorSettings, backfill_collector, run_collector
+from extraction_spec import ExtractedField, FieldSpec, extract_fields
+from resource_blocking import BlockingPolicy
+from scraper_config import env, require_env
+from value_parsers import parse_amount, parse_japanese_date
+from wait_engine import WaitEngine, failure, gone, success
 
+DEFAULT_LOGIN_URL = "https://www.e-plan.nomura.co.jp/login/index.html"
 JOB_ID = "scraper_nomura"
 DETAIL_LINK_SELECTORS = [
     'a[href*="WEAW1101.jsp"]',
@@ -43,214 +40,157 @@ INVESTED_VALUE_LABELS = [
     "取得金額",
     "投資元本",
 ]
-
-if not all([SUPABASE_URL, SUPABASE_KEY, NOMURA_LOGIN_ID, NOMURA_PASSWORD]):
-    raise ValueError("Missing environment variables.")
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-
-async def log_system(level: str, message: str, metadata: Optional[dict] = None):
-    payload = {
-        "source": JOB_ID,
-        "level": level,
-        "message": message,
-        "metadata": metadata,
-    }
-    try:
-        supabase.table("system_logs").insert(payload).execute()
-    finally:
-        print(f"[{level.upper()}] {message}")
-
-
-async def update_job_status(status: str, message: str = ""):
-    now = datetime.datetime.now(datetime.timezone.utc).isoformat()
-    try:
-        supabase.table("job_status").upsert(
-            {
-                "job_id": JOB_ID,
-                "last_run_at": now,
-                "last_status": status,
-                "message": message,
-            }
-        ).execute()
-    except Exception:
-        pass
-
-
-def clean_number(text: Optional[str]) -> int:
-    if not text:
-        return 0
-    normalized = text.replace(",", "").replace("¥", "").replace("円", "")
-    matched = re.findall(r"-?\d+(?:\.\d+)?", normalized)
-    if not matched:
-        return 0
-    try:
-        return int(float(matched[0]))
-    except ValueError:
-        return 0
-
-
-def parse_japanese_date(text: Optional[str]) -> str:
-    if not text:
-        return datetime.date.today().isoformat()
-    match = re.search(r"(20\d{2})\s*年\s*([01]?\d)\s*月\s*([0-3]?\d)\s*日", text)
-    if not match:
-        return datetime.date.today().isoformat()
-    year, month, day = (int(match.group(i)) for i in range(1, 4))
-    return f"{year:04d}-{month:02d}-{day:02d}"
-
-
-async def text_from_first_visible(page: Page, selectors: list[str]) -> Optional[str]:
-    for selector in selectors:
+# Images, fonts, media and analytics are aborted; the portal's own data endpoints always load.
+BLOCKING_POLICY = BlockingPolicy(allow_patterns=(r"nomura\.co\.jp/.*\.(?:json|jsp|do)(?:[?#]|$)",))
+
+LOGIN_FORM_SELECTOR = "#m_login_mail_address"
+LOGIN_ERROR = failure("login_error", ".formErrorContent")
+LOGIN_FORM_SHOWN = failure("login_form", LOGIN_FORM_SELECTOR, state="attached")
+HOME_SIGNALS = [success(f"value {selector}", selector) for selector in MARKET_VALUE_SELECTORS]
+# The home page already shows .m_home_mydate_result_score, so it cannot prove the detail page has loaded.
+DETAIL_SIGNALS = [success(f"detail {selector}", selector) for selector in MARKET_VALUE_SELECTORS[1:] + DATE_SELECTORS]
+HISTORY_TABLE = HistoryTableSpec(
+    amount_labels=tuple(MARKET_VALUE_LABELS),
+    invested_labels=tuple(INVESTED_VALUE_LABELS),
+)
+
+
+@dataclass(frozen=True)
+class NomuraSettings(CollectorSettings):
+    login_id: str
+    password: str
+    # Logged-in home page (NOMURA_HOME_URL), if configured. Without it, saved sessions are checked and balance
+    # retries start on the page the last login landed on.
+    home_url: Optional[str]
+
+
+@lru_cache(maxsize=None)
+def settings() -> NomuraSettings:
+    """Read (``.env`` included) and validate the settings on first use; raises ValueError if any is missing."""
+    credentials = require_env("NOMURA_LOGIN_ID", "NOMURA_PASSWORD")
+    login_url = env("NOMURA_LOGIN_URL", DEFAULT_LOGIN_URL)
+    return NomuraSettings(
+        account_name=env("NOMURA_ACCOUNT_NAME", "野村持ち株会"),
+        start_url=login_url,
+        deadline_seconds=float(env("NOMURA_DEADLINE_SECONDS", "150")),
+        history_url=env("NOMURA_HISTORY_URL"),
+        login_id=credentials["NOMURA_LOGIN_ID"],
+        password=credentials["NOMURA_PASSWORD"],
+        home_url=env("NOMURA_HOME_URL"),
+    )
+
+
+BALANCE_FIELDS = (
+    FieldSpec(
+        "market_value",
+        parse_amount,
+        selectors=tuple(MARKET_VALUE_SELECTORS),
+        labels=tuple(MARKET_VALUE_LABELS),
+        accept=lambda value: value > 0,
+    ),
+    FieldSpec("invested_value", parse_amount, labels=tuple(INVESTED_VALUE_LABELS), accept=lambda value: value > 0),
+    FieldSpec("record_date", parse_japanese_date, selectors=tuple(DATE_SELECTORS)),
+)
+# The home page summary shows the valuation date and total without opening the detail page.
+VALUATION_FIELDS = (
+    FieldSpec("record_date", parse_japanese_date, selectors=tuple(DATE_SELECTORS)),
+    FieldSpec("market_value", parse_amount, selectors=(MARKET_VALUE_SELECTORS[0],), accept=lambda value: value > 0),
+)
+
+async def maybe_open_detail_page(page: Page, waits: WaitEngine) -> bool:
+    for selector in DETAIL_LINK_SELECTORS:
         locator = page.locator(selector).first
         if await locator.count() == 0:
             continue
         try:
-            text = (await locator.inner_text()).strip()
+            await locator.click()
         except Exception:
             continue
-        if text:
-            return text
-    return None
-
-
-async def number_near_label(page: Page, labels: list[str]) -> int:
-    script = """
-      (labels) => {
-        const elements = Array.from(document.querySelectorAll('th, td, span, p, div, dt, dd, li'))
-        for (const label of labels) {
-          const matched = elements.find((element) => element.innerText && element.innerText.includes(label))
-          if (!matched) continue
-
-          const candidates = [
-            matched.nextElementSibling,
-            matched.parentElement?.nextElementSibling,
-            matched.closest('tr')?.querySelector('td:last-child'),
-            matched.closest('.financialStatus_box')?.querySelector('.number'),
-          ].filter(Boolean)
-
-          for (const candidate of candidates) {
-            const text = candidate.innerText?.trim()
-            if (text) return text
-          }
-        }
-        return ''
-      }
-    """
-    try:
-        text = await page.evaluate(script, labels)
-    except Exception:
-        return 0
-    return clean_number(text)
-
-
-async def maybe_open_detail_page(page: Page):
-    for selector in DETAIL_LINK_SELECTORS:
-      locator = page.locator(selector).first
-      if await locator.count() == 0:
-          continue
-      try:
-          await locator.click()
-          await page.wait_for_load_state("networkidle", timeout=30000)
-          await page.wait_for_timeout(2000)
-          return
-      except Exception:
-          continue
-
-
-async def resolve_market_value(page: Page) -> int:
-    by_selector = clean_number(await text_from_first_visible(page, MARKET_VALUE_SELECTORS))
-    if by_selector > 0:
-        await log_system("info", f"Found market value via selector: {by_selector}")
-        return by_selector
-
-    by_label = await number_near_label(page, MARKET_VALUE_LABELS)
-    if by_label > 0:
-        await log_system("info", f"Found market value via text: {by_label}")
-        return by_label
-
-    return 0
-
-
-async def resolve_invested_value(page: Page) -> Optional[int]:
-    invested_value = await number_near_label(page, INVESTED_VALUE_LABELS)
-    await log_system("info", f"Found invested value via text: {invested_value}")
-    return invested_value or None
-
-
-async def resolve_record_date(page: Page) -> str:
-    date_text = await text_from_first_visible(page, DATE_SELECTORS)
-    return parse_japanese_date(date_text)
-
-
-async def run():
-    await log_system("info", "Nomura Scraper started.")
-    await update_job_status("running")
-
-    try:
-        response = supabase.table("accounts").select("id").eq("name", NOMURA_ACCOUNT_NAME).single().execute()
-        if not response.data:
-            raise RuntimeError(f"Account '{NOMURA_ACCOUNT_NAME}' not found.")
-        account_id = response.data["id"]
+        await waits.race("detail_page", [*DETAIL_SIGNALS, LOGIN_ERROR, LOGIN_FORM_SHOWN], raise_on_timeout=False)
+        return True
+    return False
+
+
+async def resume_session(page: Page, waits: WaitEngine, resume_url: str) -> bool:
+    """Open the home page with the saved cookies; True when it is not bounced to the login form."""
+    await page.goto(settings().home_url or resume_url, timeout=60000, wait_until="domcontentloaded")
+    links = [success(f"link {selector}", selector) for selector in DETAIL_LINK_SELECTORS]
+    signals = [LOGIN_FORM_SHOWN, *links, *HOME_SIGNALS]
+    outcome = await waits.race("session", signals, timeout=15, raise_on_failure=False, raise_on_timeout=False)
+    return outcome.ok
+
+
+async def login(page: Page, waits: WaitEngine):
+    if await page.locator(LOGIN_FORM_SELECTOR).count() == 0:
+        await page.goto(settings().start_url, timeout=60000, wait_until="domcontentloaded")
+    if await page.locator("#m_login_tab_header_id1").count() > 0:
+        await page.click("#m_login_tab_header_id1")
+
+    await page.fill(LOGIN_FORM_SELECTOR, settings().login_id)
+    await page.fill("#m_login_mail_password", settings().password)
+    await page.click(".m_login_btn_01")
+
+    signals = [LOGIN_ERROR, gone("login_form_closed", LOGIN_FORM_SELECTOR)]
+    outcome = await waits.race("login", signals, timeout=60, raise_on_failure=False)
+    if not outcome.ok:
+        raise RuntimeError("Login failed.")
+
+
+class NomuraCollector(Collector):
+    job_id = JOB_ID
+    title = "Nomura"
+    balance_fields = BALANCE_FIELDS
+    blocking_policy = BLOCKING_POLICY
+    context_options = {
+        "user_agent": (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+        ),
+        "viewport": {"width": 1440, "height": 1200},
+    }
+    history_table = HISTORY_TABLE
+    session_lost = (LOGIN_FORM_SHOWN,)
+    # The holding is revalued at the previous day's close; the summary shows it before the market opens.
+    cadence = Cadence(datetime.time(7, 30))
 
-        async with async_playwright() as playwright:
-            browser = await playwright.chromium.launch(headless=True)
-            context = await browser.new_context(
-                user_agent=(
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-                ),
-                viewport={"width": 1440, "height": 1200},
-            )
-            page = await context.new_page()
+    def settings(self) -> NomuraSettings:
+        return settings()
 
-            await page.goto(NOMURA_LOGIN_URL, timeout=60000)
-            if await page.locator("#m_login_tab_header_id1").count() > 0:
-                await page.click("#m_login_tab_header_id1")
+    async def authenticate(self, page: Page, waits: WaitEngine, resume_url: Optional[str]) -> bool:
+        if resume_url is not None and await resume_session(page, waits, resume_url):
+            return True
+        await login(page, waits)
+        return False
 
-            await page.fill("#m_login_mail_address", NOMURA_LOGIN_ID)
-            await page.fill("#m_login_mail_password", NOMURA_PASSWORD)
-            await page.click(".m_login_btn_01")
-            await page.wait_for_load_state("networkidle", timeout=60000)
+    async def open_balance(self, page: Page, waits: WaitEngine, attempt: int, landing_url: str) -> Dict[str, Any]:
+        # A retry starts again from the home page, or from where the login landed; never from the login form.
+        if attempt > 1:
+            await page.goto(settings().home_url or landing_url, timeout=60000, wait_until="domcontentloaded")
+        detail_page = await maybe_open_detail_page(page, waits)
+        if not detail_page:
+            await waits.race("home_data", HOME_SIGNALS, timeout=20, raise_on_timeout=False)
+        return {"detail_page": detail_page}
 
-            if await page.locator(".formErrorContent").count() > 0:
-                raise RuntimeError("Login failed.")
+    async def read_valuation(self, page: Page, waits: WaitEngine) -> Dict[str, ExtractedField]:
+        await waits.race("home_valuation", HOME_SIGNALS, timeout=20, raise_on_timeout=False)
+        return await extract_fields(page, VALUATION_FIELDS)
 
-            await maybe_open_detail_page(page)
 
-            market_value = await resolve_market_value(page)
-            invested_value = await resolve_invested_value(page)
-            record_date = await resolve_record_date(page)
+COLLECTOR = NomuraCollector()
 
-            if market_value <= 0:
-                debug_metadata = {
-                    "url": page.url,
-                    "title": await page.title(),
-                }
-                await log_system("error", "Market value could not be extracted.", debug_metadata)
-                raise RuntimeError("Market value is 0.")
 
-            supabase.table("monthly_balances").upsert(
-                {
-                    "record_date": record_date,
-                    "account_id": account_id,
-                    "amount": market_value,
-                    "invested_amount": invested_value,
-                },
-                on_conflict="record_date, account_id",
-            ).execute()
+async def run(browser: Optional[Browser] = None):
+    await run_collector(COLLECTOR, browser)
 
-            await browser.close()
 
-        success_message = f"Saved to DB: {market_value:,} JPY (Invested: {invested_value})"
-        await log_system("info", success_message)
-        await update_job_status("success", success_message)
-    except Exception as error:
-        error_message = f"Failed: {error}"
-        await log_system("error", error_message, {"trace": traceback.format_exc()})
-        await update_job_status("failed", error_message)
-        raise
+async def backfill(
+    start: datetime.date,
+    end: datetime.date,
+    browser: Optional[Browser] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    restart: bool = False,
+) -> BackfillStats:
+    return await backfill_collector(COLLECTOR, start, end, browser, chunk_size, restart)
 
 
 if __name__ == "__main__":
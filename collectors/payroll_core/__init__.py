@@ -0,0 +1,53 @@
+"""Payroll slip parsing shared by collectors/payroll_parser.py and the payroll-parser-service.
+
+``parse_pdf_bytes`` is the bytes-in/result-out entry point; snapshot
+rendering and result caching are chosen per call with a ``SnapshotPolicy``
+and an optional ``PayrollResultCache``.
+"""
+
+from .cache import PayrollResultCache, cache_enabled_by_env, default_cache_path, open_default_cache, pdf_digest
+from .layout import extract_layout_details
+from .pipeline import (
+    DEFAULT_EXTRACTION_MODE,
+    EXTRACTION_MODES,
+    PARSER_VERSION,
+    iter_page_details,
+    iter_slips,
+    parse_document,
+    parse_pdf,
+    parse_pdf_bytes,
+)
+from .snapshot import (
+    DEFAULT_SNAPSHOT_POLICY,
+    SNAPSHOT_PRESETS,
+    SnapshotPolicy,
+    render_snapshot,
+    resolve_snapshot_policy,
+)
+from .text import classify_slip_type, extract_details, extract_month_iso, normalize_text
+
+__all__ = [
+    "DEFAULT_EXTRACTION_MODE",
+    "DEFAULT_SNAPSHOT_POLICY",
+    "EXTRACTION_MODES",
+    "PARSER_VERSION",
+    "SNAPSHOT_PRESETS",
+    "PayrollResultCache",
+    "SnapshotPolicy",
+    "cache_enabled_by_env",
+    "classify_slip_type",
+    "default_cache_path",
+    "extract_details",
+    "extract_layout_details",
+    "extract_month_iso",
+    "iter_page_details",
+    "iter_slips",
+    "normalize_text",
+    "open_default_cache",
+    "parse_document",
+    "parse_pdf",
+    "parse_pdf_bytes",
+    "pdf_digest",
+    "render_snapshot",
+    "resolve_snapshot_policy",
+]
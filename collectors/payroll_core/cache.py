@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+CACHE_DISABLED_VALUES = {"0", "off", "false", "no"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS payroll_results (
+    digest TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    result TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (digest, variant)
+);
+CREATE INDEX IF NOT EXISTS payroll_results_accessed_at ON payroll_results (accessed_at);
+"""
+
+
+def pdf_digest(pdf_bytes: bytes) -> str:
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def default_cache_path() -> str:
+    explicit = os.getenv("PAYROLL_CACHE_PATH")
+    if explicit:
+        return explicit
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "flola", "payroll-cache.sqlite3")
+
+
+def cache_enabled_by_env() -> bool:
+    return os.getenv("PAYROLL_CACHE", "on").strip().lower() not in CACHE_DISABLED_VALUES
+
+
+class PayrollResultCache:
+    """Size-bounded LRU cache of parse results keyed by PDF SHA-256 and a variant.
+
+    The variant carries the parser version and anything else that changes the
+    output (e.g. the snapshot policy). Rows live in a WAL-mode sqlite file so
+    several worker processes can share one cache safely. Entries whose
+    ``snapshot_path`` no longer exists are treated as misses.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        include_snapshots: bool = True,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.include_snapshots = include_snapshots
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state.pop("_local")
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None or getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, digest: str, variant: str) -> Optional[Dict[str, Any]]:
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT result FROM payroll_results WHERE digest = ? AND variant = ?",
+            (digest, variant),
+        ).fetchone()
+        if row is None:
+            return None
+
+        result = json.loads(row[0])
+        snapshot_path = result.get("snapshot_path")
+        if snapshot_path and not os.path.exists(snapshot_path):
+            return None
+
+        connection.execute(
+            "UPDATE payroll_results SET accessed_at = ? WHERE digest = ? AND variant = ?",
+            (time.time(), digest, variant),
+        )
+        return result
+
+    def put(self, digest: str, variant: str, result: Dict[str, Any]) -> None:
+        if "snapshot" in result and not self.include_snapshots:
+            return
+
+        encoded = json.dumps(result, ensure_ascii=False)
+        size = len(encoded.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO payroll_results (digest, variant, result, size, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (digest, variant, encoded, size, time.time()),
+        )
+        self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM payroll_results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute(
+                "SELECT digest, variant, size FROM payroll_results ORDER BY accessed_at"
+            ).fetchall()
+            for digest, variant, size in rows:
+                if total <= self.max_bytes:
+                    break
+                connection.execute(
+                    "DELETE FROM payroll_results WHERE digest = ? AND variant = ?",
+                    (digest, variant),
+                )
+                total -= size
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+
+def open_default_cache(path: Optional[str] = None, include_snapshots: bool = True) -> Optional[PayrollResultCache]:
+    if path is None and not cache_enabled_by_env():
+        return None
+    max_bytes = int(os.getenv("PAYROLL_CACHE_MAX_BYTES", str(DEFAULT_MAX_BYTES)))
+    return PayrollResultCache(path or default_cache_path(), max_bytes=max_bytes, include_snapshots=include_snapshots)
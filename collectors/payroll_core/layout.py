@@ -0,0 +1,153 @@
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .text import clean_label, is_valid_label
+
+NUMBER_VALUE_PATTERN = re.compile(r"^[+-]?[0-9][0-9,]*(?:\.[0-9]+)?$")
+LABELLED_NUMBER_PATTERN = re.compile(
+    r"^(?P<label>.+?)[:\s]+(?P<number>[+-]?[0-9][0-9,]*(?:\.[0-9]+)?)円?$"
+)
+CURRENCY_MARKS = ("円", "¥")
+
+# Words closer than this many character heights belong to the same phrase.
+PHRASE_GAP_RATIO = 1.2
+# How many rows below a label to look for its value.
+BELOW_SEARCH_ROWS = 2
+
+Word = Sequence  # (x0, y0, x1, y1, text, block_no, line_no, word_no) from page.get_text("words")
+
+
+@dataclass
+class TextBox:
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    text: str
+    number: Optional[str] = None
+    label: Optional[str] = None
+    used: bool = False
+
+    @property
+    def height(self) -> float:
+        return max(self.y1 - self.y0, 1.0)
+
+    @property
+    def center_y(self) -> float:
+        return (self.y0 + self.y1) / 2
+
+    def overlaps_horizontally(self, other: "TextBox") -> bool:
+        return min(self.x1, other.x1) - max(self.x0, other.x0) > 0
+
+
+def normalize_phrase(text: str) -> str:
+    normalized = unicodedata.normalize("NFKC", text).replace("　", " ")
+    return " ".join(normalized.split())
+
+
+def as_number(text: str) -> Optional[str]:
+    value = text
+    for mark in CURRENCY_MARKS:
+        value = value.replace(mark, "")
+    value = value.replace(" ", "")
+    if NUMBER_VALUE_PATTERN.fullmatch(value):
+        return value.replace(",", "")
+    return None
+
+
+def group_phrases(words: Iterable[Word]) -> List[TextBox]:
+    """Merge adjacent words of one PyMuPDF line into phrases, split at wide gaps."""
+    phrases: List[TextBox] = []
+    current: Optional[TextBox] = None
+    current_line: Optional[Tuple[int, int]] = None
+
+    for x0, y0, x1, y1, text, block_no, line_no, *_ in words:
+        line_key = (block_no, line_no)
+        gap_limit = max(y1 - y0, 1.0) * PHRASE_GAP_RATIO
+        if current is not None and line_key == current_line and x0 - current.x1 <= gap_limit:
+            current.x1 = max(current.x1, x1)
+            current.y0 = min(current.y0, y0)
+            current.y1 = max(current.y1, y1)
+            current.text = f"{current.text} {text}"
+            continue
+
+        current = TextBox(x0, y0, x1, y1, text)
+        current_line = line_key
+        phrases.append(current)
+
+    return phrases
+
+
+def group_rows(boxes: List[TextBox]) -> List[List[TextBox]]:
+    """Cluster boxes whose vertical centres are within half a line of each other."""
+    rows: List[List[TextBox]] = []
+    for box in sorted(boxes, key=lambda item: (item.center_y, item.x0)):
+        if rows:
+            row = rows[-1]
+            if abs(box.center_y - row[0].center_y) <= min(box.height, row[0].height) / 2:
+                row.append(box)
+                continue
+        rows.append([box])
+
+    for row in rows:
+        row.sort(key=lambda item: item.x0)
+    return rows
+
+
+def extract_layout_details(words: Iterable[Word]) -> Dict[str, str]:
+    """Pair labels with values by position instead of by flattened text order.
+
+    Words are merged into phrases, phrases are sorted into rows, and each
+    label takes the number immediately to its right in the same row. Labels
+    with no such number take the first horizontally overlapping box in the
+    next ``BELOW_SEARCH_ROWS`` rows, if it is a number. Each number is used
+    at most once.
+    """
+    boxes = group_phrases(words)
+    details: Dict[str, str] = {}
+
+    for box in boxes:
+        text = normalize_phrase(box.text)
+        box.number = as_number(text)
+        if box.number is not None:
+            continue
+
+        labelled = LABELLED_NUMBER_PATTERN.match(text)
+        if labelled:
+            label = clean_label(labelled.group("label"))
+            if is_valid_label(label):
+                details[label] = labelled.group("number").replace(",", "")
+                continue
+
+        label = clean_label(text)
+        if is_valid_label(label):
+            box.label = label
+
+    rows = group_rows(boxes)
+    pending: List[Tuple[int, int]] = []
+
+    for row_index, row in enumerate(rows):
+        for column, box in enumerate(row):
+            if box.label is None:
+                continue
+            neighbour = row[column + 1] if column + 1 < len(row) else None
+            if neighbour is not None and neighbour.number is not None and not neighbour.used:
+                neighbour.used = True
+                details[box.label] = neighbour.number
+            elif neighbour is None or neighbour.number is None:
+                pending.append((row_index, column))
+
+    for row_index, column in pending:
+        box = rows[row_index][column]
+        for below_row in rows[row_index + 1 : row_index + 1 + BELOW_SEARCH_ROWS]:
+            below = next((item for item in below_row if item.overlaps_horizontally(box)), None)
+            if below is None:
+                continue
+            if below.number is not None and not below.used:
+                below.used = True
+                details[box.label] = below.number
+            break
+
+    return details
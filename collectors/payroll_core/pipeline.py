@@ -0,0 +1,133 @@
+import os
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import fitz
+
+from .cache import PayrollResultCache, pdf_digest
+from .layout import extract_layout_details
+from .snapshot import DEFAULT_SNAPSHOT_POLICY, SnapshotPolicy, render_snapshot
+from .text import classify_slip_type, extract_details, extract_month_iso
+
+# Bump whenever extraction output changes so cached results are not reused.
+PARSER_VERSION = "4"
+EXTRACTION_MODES = ("text", "layout")
+DEFAULT_EXTRACTION_MODE = "text"
+
+
+def iter_page_details(
+    document: "fitz.Document",
+    mode: str = DEFAULT_EXTRACTION_MODE,
+) -> Iterator[Tuple[Optional[str], Dict[str, str]]]:
+    """Yield ``(month, details)`` per page, extracting each page's content once.
+
+    ``text`` reads the flattened page text; ``layout`` reads word boxes and
+    pairs labels with values by position (see layout.py).
+    """
+    for page in document:
+        if mode == "layout":
+            words = page.get_text("words", sort=True)
+            month = extract_month_iso(" ".join(word[4] for word in words))
+            yield month, extract_layout_details(words)
+        else:
+            page_text = page.get_text("text", sort=True)
+            yield extract_month_iso(page_text), extract_details(page_text)
+
+
+def iter_slips(pages: Iterable[Tuple[Optional[str], Dict[str, str]]]) -> Iterator[Dict[str, Any]]:
+    """Group consecutive pages into slips and yield each one once it is complete.
+
+    A page whose month differs from the current slip's month starts a new
+    slip; pages without a month (continuation pages) extend the current one.
+    Only one page is held at a time.
+    """
+    slip: Optional[Dict[str, Any]] = None
+
+    for page_number, (month, page_details) in enumerate(pages):
+        if slip is not None and month and slip["month"] and month != slip["month"]:
+            if slip["details"]:
+                yield slip
+            slip = None
+
+        if slip is None:
+            slip = {"month": month, "details": {}, "pages": [page_number, page_number]}
+        elif not slip["month"]:
+            slip["month"] = month
+
+        slip["details"].update(page_details)
+        slip["pages"][1] = page_number
+
+    if slip is not None and slip["details"]:
+        yield slip
+
+
+def parse_document(
+    document: "fitz.Document",
+    file_name: str,
+    snapshot_policy: SnapshotPolicy = DEFAULT_SNAPSHOT_POLICY,
+    mode: str = DEFAULT_EXTRACTION_MODE,
+) -> Optional[Dict[str, Any]]:
+    if len(document) == 0:
+        return None
+
+    slips = list(iter_slips(iter_page_details(document, mode)))
+    if not slips:
+        return {"error": "No payroll fields found"}
+
+    first_slip = slips[0]
+    return {
+        "month": first_slip["month"],
+        "type": classify_slip_type(file_name),
+        **render_snapshot(document[first_slip["pages"][0]], snapshot_policy),
+        "details": first_slip["details"],
+        "slips": slips,
+    }
+
+
+def with_slip_type(cached: Dict[str, Any], file_name: str) -> Dict[str, Any]:
+    # The slip type comes from the file name, so it is not part of the cached result.
+    if "error" in cached:
+        return cached
+    rest = {key: value for key, value in cached.items() if key != "month"}
+    return {"month": cached.get("month"), "type": classify_slip_type(file_name), **rest}
+
+
+def parse_pdf(
+    pdf_path: str,
+    snapshot_policy: SnapshotPolicy = DEFAULT_SNAPSHOT_POLICY,
+    cache: Optional[PayrollResultCache] = None,
+    mode: str = DEFAULT_EXTRACTION_MODE,
+) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(pdf_path):
+        return None
+
+    if cache is not None:
+        with open(pdf_path, "rb") as file:
+            return parse_pdf_bytes(file.read(), pdf_path, snapshot_policy, cache, mode)
+
+    with fitz.open(pdf_path) as document:
+        return parse_document(document, pdf_path, snapshot_policy, mode)
+
+
+def parse_pdf_bytes(
+    pdf_bytes: bytes,
+    file_name: str,
+    snapshot_policy: SnapshotPolicy = DEFAULT_SNAPSHOT_POLICY,
+    cache: Optional[PayrollResultCache] = None,
+    mode: str = DEFAULT_EXTRACTION_MODE,
+) -> Optional[Dict[str, Any]]:
+    if cache is None:
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as document:
+            return parse_document(document, file_name, snapshot_policy, mode)
+
+    digest = pdf_digest(pdf_bytes)
+    variant = f"{PARSER_VERSION}|{mode}|{snapshot_policy.cache_key}"
+    cached = cache.get(digest, variant)
+    if cached is not None:
+        return with_slip_type(cached, file_name)
+
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as document:
+        result = parse_document(document, file_name, snapshot_policy, mode)
+
+    if result is not None:
+        cache.put(digest, variant, {key: value for key, value in result.items() if key != "type"})
+    return result
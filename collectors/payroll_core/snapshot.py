@@ -0,0 +1,118 @@
+import base64
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+
+import fitz
+
+IMAGE_MIME_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
+
+
+@dataclass(frozen=True)
+class SnapshotPolicy:
+    """How (and whether) the first page of a slip is rendered into the result.
+
+    ``format`` is ``none`` or an image format from ``IMAGE_MIME_TYPES``. When
+    ``directory`` is set the image is written there under its SHA-256 name
+    and only the path is returned, instead of a base64 data URL.
+    """
+
+    format: str = "png"
+    dpi: int = 144
+    quality: int = 80
+    directory: Optional[str] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.format != "none"
+
+    @property
+    def cache_key(self) -> str:
+        if not self.enabled:
+            return "none"
+        return f"{self.format}:{self.dpi}:{self.quality}:{self.directory or ''}"
+
+
+SNAPSHOT_PRESETS: Dict[str, SnapshotPolicy] = {
+    "none": SnapshotPolicy(format="none"),
+    "png": SnapshotPolicy(format="png", dpi=144),
+    "thumbnail": SnapshotPolicy(format="jpeg", dpi=48, quality=70),
+    "jpeg": SnapshotPolicy(format="jpeg", dpi=144, quality=80),
+    "webp": SnapshotPolicy(format="webp", dpi=144, quality=80),
+}
+
+DEFAULT_SNAPSHOT_POLICY = SNAPSHOT_PRESETS["png"]
+
+
+def resolve_snapshot_policy(
+    preset: Optional[str] = None,
+    dpi: Optional[int] = None,
+    quality: Optional[int] = None,
+    directory: Optional[str] = None,
+) -> SnapshotPolicy:
+    if preset is None:
+        policy = DEFAULT_SNAPSHOT_POLICY
+    elif preset in SNAPSHOT_PRESETS:
+        policy = SNAPSHOT_PRESETS[preset]
+    else:
+        raise ValueError(f"Unknown snapshot policy: {preset}")
+
+    overrides = {}
+    if dpi is not None:
+        overrides["dpi"] = dpi
+    if quality is not None:
+        overrides["quality"] = quality
+    if directory is not None:
+        overrides["directory"] = directory
+    return replace(policy, **overrides) if overrides else policy
+
+
+def encode_page(page: "fitz.Page", policy: SnapshotPolicy) -> bytes:
+    pixmap = page.get_pixmap(dpi=policy.dpi)
+    if policy.format == "png":
+        return pixmap.tobytes("png")
+    if policy.format == "jpeg":
+        return pixmap.tobytes("jpeg", jpg_quality=policy.quality)
+    if policy.format == "webp":
+        # PyMuPDF has no native WebP writer; this path needs Pillow.
+        return pixmap.pil_tobytes(format="WEBP", quality=policy.quality)
+    raise ValueError(f"Unsupported snapshot format: {policy.format}")
+
+
+def write_content_addressed(directory: str, data: bytes, extension: str) -> str:
+    digest = hashlib.sha256(data).hexdigest()
+    target_dir = os.path.join(directory, digest[:2])
+    target_path = os.path.join(target_dir, f"{digest}.{extension}")
+    if os.path.exists(target_path):
+        return target_path
+
+    os.makedirs(target_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=target_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, target_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return target_path
+
+
+def render_snapshot(page: "fitz.Page", policy: SnapshotPolicy) -> Dict[str, str]:
+    """Return the result fields for ``page`` under ``policy`` (empty when disabled)."""
+    if not policy.enabled:
+        return {}
+
+    data = encode_page(page, policy)
+    if policy.directory:
+        return {"snapshot_path": write_content_addressed(policy.directory, data, policy.format)}
+
+    encoded = base64.b64encode(data).decode("utf-8")
+    return {"snapshot": f"data:{IMAGE_MIME_TYPES[policy.format]};base64,{encoded}"}
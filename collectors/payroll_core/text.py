@@ -0,0 +1,170 @@
+import os
+import re
+import unicodedata
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+MONTH_PATTERN = re.compile(r"(20\d{2})\s*年\s*([01]?\d)\s*月")
+TRAILING_NUMBER_PATTERN = re.compile(
+    r"^(?P<label>.+?)(?:[:：\s]+)(?P<number>[+-]?[0-9][0-9,]*(?:\.[0-9]+)?)$"
+)
+INLINE_NUMBER_PATTERN = re.compile(
+    r"(?P<label>[^:：\n]+?)\s*[:：]\s*(?P<number>[+-]?[0-9][0-9,]*(?:\.[0-9]+)?)"
+)
+NUMBER_ONLY_PATTERN = re.compile(r"^[+-]?[0-9][0-9,]*(?:\.[0-9]+)?$")
+NUMBER_PREFIX_PATTERN = re.compile(r"[+-]?[0-9][0-9,]*(?:\.[0-9]+)?")
+
+NOISE_LABELS = {
+    "支給",
+    "控除",
+    "勤怠",
+    "備考",
+    "摘要",
+    "所属",
+    "社員番号",
+    "氏名",
+    "明細",
+}
+
+
+# NFKC maps "：" to ":", so normalized text only ever contains ASCII colons.
+NUMBER_START_CHARS = frozenset("0123456789+-")
+NUMBER_END_CHARS = frozenset("0123456789,")
+
+
+def normalize_page(text: str) -> str:
+    normalized = unicodedata.normalize("NFKC", text or "")
+    return normalized.replace("\u3000", " ").replace("¥", "")
+
+
+def normalize_text(value: str) -> str:
+    return normalize_page(value).strip()
+
+
+def clean_number(value: str) -> str:
+    return normalize_text(value).replace(",", "")
+
+
+def clean_label(value: str) -> str:
+    return label_from_normalized(normalize_text(value))
+
+
+def label_from_normalized(value: str) -> str:
+    # str.split() and r"\s+" agree on what whitespace is, and split() is cheaper.
+    return " ".join(value.split()).strip(" :：-")
+
+
+def is_valid_label(label: str) -> bool:
+    if not label or len(label) > 40:
+      return False
+    if label[0] in NUMBER_START_CHARS and NUMBER_ONLY_PATTERN.fullmatch(label):
+      return False
+    return label not in NOISE_LABELS
+
+
+def extract_month_iso(text: str) -> Optional[str]:
+    match = MONTH_PATTERN.search(normalize_text(text))
+    if not match:
+        return None
+
+    year = int(match.group(1))
+    month = int(match.group(2))
+    if not 1 <= month <= 12:
+        return None
+
+    return f"{year:04d}-{month:02d}-01"
+
+
+def classify_slip_type(pdf_path: str) -> str:
+    filename = os.path.basename(pdf_path).upper()
+    if filename.startswith("SYO"):
+        return "賞与"
+    return "給与"
+
+
+def iter_lines(page_text: str) -> Iterable[str]:
+    for raw_line in normalize_page(page_text).splitlines():
+        line = raw_line.strip()
+        if line:
+            yield line
+
+
+def inline_pairs(line: str) -> Iterator[Tuple[str, str]]:
+    """Yield ``label: number`` pairs left to right, as INLINE_NUMBER_PATTERN.finditer would.
+
+    Each label runs from the end of the previous pair (or from just after a
+    colon that was not followed by a number) up to the next colon.
+    """
+    segment_start = 0
+    colon = line.find(":")
+    while colon >= 0:
+        position = colon + 1
+        while position < len(line) and line[position].isspace():
+            position += 1
+        number = NUMBER_PREFIX_PATTERN.match(line, position) if colon > segment_start else None
+
+        if number is None:
+            segment_start = colon + 1
+        else:
+            yield line[segment_start:colon], number.group()
+            segment_start = number.end()
+        colon = line.find(":", segment_start)
+
+
+def trailing_pair(line: str) -> Optional[Tuple[str, str]]:
+    """Split ``label<separators>number`` off the end of a line, as TRAILING_NUMBER_PATTERN would."""
+    if line[-1] not in NUMBER_END_CHARS:
+        return None
+
+    number = line.rsplit(None, 1)[-1].rpartition(":")[2]
+    if not NUMBER_ONLY_PATTERN.fullmatch(number):
+        return None
+
+    separated = line[: len(line) - len(number)]
+    label = separated.rstrip()
+    while label.endswith(":"):
+        label = label[:-1].rstrip()
+
+    # A label made only of separators can never be valid, so it counts as no match.
+    if not label or len(label) == len(separated):
+        return None
+    return label, number
+
+
+def extract_details(page_text: str) -> Dict[str, str]:
+    """Collect label/number pairs from a page of slip text.
+
+    The page is normalized once; each line is then classified with cheap
+    character checks (contains a colon, ends in a number, ends in a colon)
+    so the label/number scan only runs where a pair can exist.
+    """
+    details: Dict[str, str] = {}
+    pending_label: Optional[str] = None
+
+    for line in iter_lines(page_text):
+        if pending_label and NUMBER_ONLY_PATTERN.fullmatch(line):
+            details[pending_label] = line.replace(",", "")
+            pending_label = None
+            continue
+
+        if ":" in line:
+            for raw_label, number in inline_pairs(line):
+                label = label_from_normalized(raw_label)
+                if is_valid_label(label):
+                    details[label] = number.replace(",", "")
+
+        trailing = trailing_pair(line)
+        if trailing:
+            label = label_from_normalized(trailing[0])
+            if is_valid_label(label):
+                details[label] = trailing[1].replace(",", "")
+                pending_label = None
+                continue
+
+        if line[-1] == ":":
+            label = label_from_normalized(line[:-1])
+            pending_label = label if is_valid_label(label) else None
+            continue
+
+        pending_label = None
+
+    return details
@@ -1,157 +1,259 @@
 import argparse
 import base64
+import glob
 import io
 import json
 import os
-import re
 import sys
-import unicodedata
-from typing import Any, Dict, Iterable, Optional
-
-import fitz
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from payroll_core import (
+    DEFAULT_EXTRACTION_MODE,
+    DEFAULT_SNAPSHOT_POLICY,
+    EXTRACTION_MODES,
+    SNAPSHOT_PRESETS,
+    PayrollResultCache,
+    SnapshotPolicy,
+    open_default_cache,
+    parse_pdf,
+    parse_pdf_bytes,
+    resolve_snapshot_policy,
+)
 
 if sys.platform == "win32":
+    sys.stdin = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
 
-MONTH_PATTERN = re.compile(r"(20\d{2})\s*年\s*([01]?\d)\s*月")
-TRAILING_NUMBER_PATTERN = re.compile(
-    r"^(?P<label>.+?)(?:[:：\s]+)(?P<number>[+-]?[0-9][0-9,]*(?:\.[0-9]+)?)$"
-)
-INLINE_NUMBER_PATTERN = re.compile(
-    r"(?P<label>[^:：\n]+?)\s*[:：]\s*(?P<number>[+-]?[0-9][0-9,]*(?:\.[0-9]+)?)"
-)
-NUMBER_ONLY_PATTERN = re.compile(r"^[+-]?[0-9][0-9,]*(?:\.[0-9]+)?$")
-
-NOISE_LABELS = {
-    "支給",
-    "控除",
-    "勤怠",
-    "備考",
-    "摘要",
-    "所属",
-    "社員番号",
-    "氏名",
-    "明細",
-}
-
-
-def normalize_text(value: str) -> str:
-    normalized = unicodedata.normalize("NFKC", value or "")
-    normalized = normalized.replace("\u3000", " ")
-    normalized = normalized.replace("¥", "")
-    return normalized.strip()
-
-
-def clean_number(value: str) -> str:
-    return normalize_text(value).replace(",", "")
-
-
-def clean_label(value: str) -> str:
-    label = normalize_text(value)
-    label = re.sub(r"\s+", " ", label)
-    return label.strip(" :：-")
-
-
-def is_valid_label(label: str) -> bool:
-    if not label or len(label) > 40:
-      return False
-    if NUMBER_ONLY_PATTERN.fullmatch(label):
-      return False
-    return label not in NOISE_LABELS
-
-
-def extract_month_iso(text: str) -> Optional[str]:
-    match = MONTH_PATTERN.search(normalize_text(text))
-    if not match:
-        return None
-
-    year = int(match.group(1))
-    month = int(match.group(2))
-    if not 1 <= month <= 12:
-        return None
-
-    return f"{year:04d}-{month:02d}-01"
-
 
-def classify_slip_type(pdf_path: str) -> str:
-    filename = os.path.basename(pdf_path).upper()
-    if filename.startswith("SYO"):
-        return "賞与"
-    return "給与"
-
-
-def iter_lines(page_text: str) -> Iterable[str]:
-    for raw_line in page_text.splitlines():
-        line = normalize_text(raw_line)
-        if line:
-            yield line
-
-
-def extract_details(page_text: str) -> Dict[str, str]:
-    details: Dict[str, str] = {}
-    pending_label: Optional[str] = None
-
-    for line in iter_lines(page_text):
-        if pending_label and NUMBER_ONLY_PATTERN.fullmatch(line):
-            details[pending_label] = clean_number(line)
-            pending_label = None
+def handle_request(
+    request: Dict[str, Any],
+    snapshot_policy: SnapshotPolicy = DEFAULT_SNAPSHOT_POLICY,
+    cache: Optional[PayrollResultCache] = None,
+    mode: str = DEFAULT_EXTRACTION_MODE,
+) -> Dict[str, Any]:
+    if "snapshot" in request:
+        snapshot_policy = resolve_snapshot_policy(request["snapshot"], directory=snapshot_policy.directory)
+    mode = request.get("mode") or mode
+    if mode not in EXTRACTION_MODES:
+        return {"error": f"Unknown extraction mode: {mode}"}
+
+    if "pdf" in request:
+        pdf_bytes = base64.b64decode(request["pdf"])
+        file_name = request.get("filename") or "payroll.pdf"
+        result = parse_pdf_bytes(pdf_bytes, file_name, snapshot_policy, cache, mode)
+    elif "path" in request:
+        result = parse_pdf(request["path"], snapshot_policy, cache, mode)
+    else:
+        result = {"error": "Request must contain 'pdf' or 'path'"}
+    return result or {"error": "Failed to parse PDF"}
+
+
+def serve(
+    input_stream: TextIO,
+    output_stream: TextIO,
+    snapshot_policy: SnapshotPolicy = DEFAULT_SNAPSHOT_POLICY,
+    cache: Optional[PayrollResultCache] = None,
+    mode: str = DEFAULT_EXTRACTION_MODE,
+) -> None:
+    """Answer JSON-lines parse requests until stdin closes.
+
+    Each request line is ``{"id": ..., "filename": ..., "pdf": <base64>}`` (or
+    ``"path"`` instead of ``"pdf"``, plus optional ``"snapshot"`` and ``"mode"``)
+    and is answered with exactly one line of ``{"id": ..., "result": ...}``.
+    A ``{"ready": true}`` line is written once at startup so callers know the
+    interpreter and PyMuPDF are loaded.
+    """
+
+    def write(payload: Dict[str, Any]) -> None:
+        output_stream.write(json.dumps(payload, ensure_ascii=False) + "\n")
+        output_stream.flush()
+
+    write({"ready": True})
+    for raw_line in input_stream:
+        if not raw_line.strip():
             continue
 
-        for match in INLINE_NUMBER_PATTERN.finditer(line):
-            label = clean_label(match.group("label"))
-            number = clean_number(match.group("number"))
-            if is_valid_label(label):
-                details[label] = number
-
-        trailing_match = TRAILING_NUMBER_PATTERN.match(line)
-        if trailing_match:
-            label = clean_label(trailing_match.group("label"))
-            number = clean_number(trailing_match.group("number"))
-            if is_valid_label(label):
-                details[label] = number
-                pending_label = None
-                continue
-
-        if line.endswith(":") or line.endswith("："):
-            label = clean_label(line[:-1])
-            pending_label = label if is_valid_label(label) else None
-            continue
-
-        pending_label = None
-
-    return details
-
+        request_id = None
+        try:
+            request = json.loads(raw_line)
+            request_id = request.get("id")
+            result = handle_request(request, snapshot_policy, cache, mode)
+        except Exception as error:
+            result = {"error": f"{type(error).__name__}: {error}"}
+        write({"id": request_id, "result": result})
+
+
+def available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def expand_inputs(inputs: Iterable[str]) -> List[str]:
+    """Resolve directories, glob patterns and plain paths into a de-duplicated PDF list."""
+    paths: List[str] = []
+    seen = set()
+
+    def add(path: str) -> None:
+        if path not in seen:
+            seen.add(path)
+            paths.append(path)
+
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                for name in sorted(files):
+                    if name.lower().endswith(".pdf"):
+                        add(os.path.join(root, name))
+        elif glob.has_magic(item):
+            for path in sorted(glob.glob(item, recursive=True)):
+                if os.path.isfile(path):
+                    add(path)
+        else:
+            add(item)
+
+    return paths
+
+
+def parse_batch_item(
+    pdf_path: str,
+    snapshot_policy: SnapshotPolicy,
+    cache: Optional[PayrollResultCache],
+    mode: str,
+) -> Dict[str, Any]:
+    try:
+        result = parse_pdf(pdf_path, snapshot_policy, cache, mode)
+    except Exception as error:
+        return {"path": pdf_path, "error": f"{type(error).__name__}: {error}"}
+
+    if result is None:
+        return {"path": pdf_path, "error": "Failed to parse PDF"}
+    if "error" in result:
+        return {"path": pdf_path, "error": result["error"]}
+    return {"path": pdf_path, "result": result}
+
+
+def iter_batch(
+    pdf_paths: List[str],
+    workers: Optional[int] = None,
+    ordered: bool = True,
+    snapshot_policy: SnapshotPolicy = DEFAULT_SNAPSHOT_POLICY,
+    cache: Optional[PayrollResultCache] = None,
+    mode: str = DEFAULT_EXTRACTION_MODE,
+) -> Iterator[Dict[str, Any]]:
+    """Parse ``pdf_paths`` in a process pool, yielding one record per file.
+
+    With ``ordered`` the records follow the input order; otherwise each one is
+    yielded as soon as its file finishes. A failing file produces an
+    ``{"path", "error"}`` record instead of aborting the batch.
+    """
+    if not pdf_paths:
+        return
+
+    max_workers = min(workers or available_cores(), len(pdf_paths))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures: Dict[Future, str] = {
+            executor.submit(parse_batch_item, pdf_path, snapshot_policy, cache, mode): pdf_path for pdf_path in pdf_paths
+        }
+        pending = futures if ordered else as_completed(futures)
+        for future in pending:
+            try:
+                yield future.result()
+            except Exception as error:
+                yield {"path": futures[future], "error": f"{type(error).__name__}: {error}"}
+
+
+def read_file_list(source: str) -> List[str]:
+    if source == "-":
+        return [line.strip() for line in sys.stdin if line.strip()]
+    with open(source, encoding="utf-8") as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+def run_batch(
+    args: argparse.Namespace,
+    snapshot_policy: SnapshotPolicy,
+    cache: Optional[PayrollResultCache],
+) -> int:
+    inputs = list(args.paths)
+    if args.files_from:
+        inputs.extend(read_file_list(args.files_from))
+
+    failures = 0
+    records = iter_batch(
+        expand_inputs(inputs),
+        workers=args.workers,
+        ordered=not args.unordered,
+        snapshot_policy=snapshot_policy,
+        cache=cache,
+        mode=args.mode,
+    )
+    for record in records:
+        failures += "error" in record
+        print(json.dumps(record, ensure_ascii=False), flush=True)
+    return 1 if failures else 0
 
-def parse_pdf(pdf_path: str) -> Optional[Dict[str, Any]]:
-    if not os.path.exists(pdf_path):
-        return None
 
-    with fitz.open(pdf_path) as document:
-        if len(document) == 0:
-            return None
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="*", metavar="pdf_path")
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="keep running and answer JSON-lines requests on stdin/stdout",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="treat the arguments as PDF files, directories or globs and emit one JSON line per file",
+    )
+    parser.add_argument("--files-from", help="read additional batch paths from a file ('-' for stdin)")
+    parser.add_argument("--workers", type=int, help="batch worker processes (default: available cores)")
+    parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="emit batch results as files finish instead of in input order",
+    )
+    parser.add_argument(
+        "--snapshot",
+        choices=sorted(SNAPSHOT_PRESETS),
+        help="page snapshot policy (default: png); 'none' skips rendering entirely",
+    )
+    parser.add_argument("--snapshot-dpi", type=int, help="override the snapshot resolution")
+    parser.add_argument("--snapshot-quality", type=int, help="override the JPEG/WebP quality")
+    parser.add_argument(
+        "--snapshot-dir",
+        help="write snapshots to this content-addressed directory instead of inlining them",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=EXTRACTION_MODES,
+        default=DEFAULT_EXTRACTION_MODE,
+        help="'layout' pairs labels and values by word position instead of text order",
+    )
+    parser.add_argument("--cache", help="result cache file (default: $PAYROLL_CACHE_PATH or ~/.cache/flola)")
+    parser.add_argument("--no-cache", action="store_true", help="always parse, never read or write the cache")
+    args = parser.parse_args()
 
-        page = document[0]
-        pixmap = page.get_pixmap(matrix=fitz.Matrix(2.0, 2.0))
-        snapshot = base64.b64encode(pixmap.tobytes("png")).decode("utf-8")
-        page_text = page.get_text("text", sort=True)
-        month = extract_month_iso(page_text)
-        details = extract_details(page_text)
+    policy = resolve_snapshot_policy(
+        args.snapshot,
+        dpi=args.snapshot_dpi,
+        quality=args.snapshot_quality,
+        directory=args.snapshot_dir,
+    )
 
-        if not details:
-            return {"error": "No payroll fields found"}
+    cache = None if args.no_cache else open_default_cache(args.cache)
 
-        return {
-            "month": month,
-            "type": classify_slip_type(pdf_path),
-            "snapshot": f"data:image/png;base64,{snapshot}",
-            "details": details,
-        }
+    if args.serve:
+        serve(sys.stdin, sys.stdout, policy, cache, args.mode)
+        sys.exit(0)
 
+    if args.batch or args.files_from:
+        sys.exit(run_batch(args, policy, cache))
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument("pdf_path")
-    args = parser.parse_args()
+    if len(args.paths) != 1:
+        parser.error("exactly one pdf_path is required unless --serve or --batch is given")
 
-    result = parse_pdf(args.pdf_path)
+    result = parse_pdf(args.paths[0], policy, cache, args.mode)
     print(json.dumps(result or {"error": "Failed to parse PDF"}, ensure_ascii=False))
@@ -0,0 +1,126 @@
+"""Per-phase wall time and network use of one scraper run.
+
+``PhaseTimer.phase`` times a block (``begin``/``end`` for spans that cannot
+be a ``with`` block). Once the context's ``BlockingStats`` is attached with
+``watch_network``, each span also records the requests and response bytes
+seen while it was open. ``as_metadata()`` goes into the run's system_logs
+row; with ``SCRAPER_TRACE_DIR`` set, ``write_trace`` also saves the run as a
+Chrome trace file (open it in chrome://tracing or https://ui.perfetto.dev).
+"""
+
+import datetime
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from resource_blocking import BlockingStats
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    end: Optional[float] = None
+    requests: int = 0
+    bytes: int = 0
+    args: Dict[str, Any] = field(default_factory=dict)
+    network_baseline: Tuple[int, int] = (0, 0)
+
+    @property
+    def seconds(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class PhaseTimer:
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.started = time.perf_counter()
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self.spans: List[Span] = []
+        self.network: Optional[BlockingStats] = None
+
+    def watch_network(self, stats: BlockingStats) -> None:
+        self.network = stats
+
+    def _network_counters(self) -> Tuple[int, int]:
+        if self.network is None:
+            return 0, 0
+        return self.network.requests, self.network.bytes_loaded
+
+    def begin(self, name: str, **args: Any) -> Span:
+        span = Span(name, time.perf_counter(), args=args, network_baseline=self._network_counters())
+        self.spans.append(span)
+        return span
+
+    def end(self, span: Span, **args: Any) -> None:
+        span.end = time.perf_counter()
+        requests, loaded = self._network_counters()
+        span.requests = requests - span.network_baseline[0]
+        span.bytes = loaded - span.network_baseline[1]
+        span.args.update(args)
+
+    @contextmanager
+    def phase(self, name: str, **args: Any) -> Iterator[Span]:
+        span = self.begin(name, **args)
+        try:
+            yield span
+        except BaseException as error:
+            span.args["error"] = type(error).__name__
+            raise
+        finally:
+            self.end(span)
+
+    def as_metadata(self) -> Dict[str, Any]:
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000),
+            "phases": [
+                {
+                    "name": span.name,
+                    "start_ms": round((span.start - self.started) * 1000),
+                    "ms": round(span.seconds * 1000),
+                    "requests": span.requests,
+                    "bytes": span.bytes,
+                    **span.args,
+                }
+                for span in self.spans
+            ],
+        }
+
+    def trace_events(self) -> List[Dict[str, Any]]:
+        events: List[Dict[str, Any]] = [
+            {"name": "process_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": self.job_id}},
+        ]
+        for span in self.spans:
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": "phase",
+                    "ph": "X",
+                    "ts": round((span.start - self.started) * 1_000_000),
+                    "dur": round(span.seconds * 1_000_000),
+                    "pid": 1,
+                    "tid": 1,
+                    "args": {"requests": span.requests, "bytes": span.bytes, **span.args},
+                }
+            )
+        return events
+
+    def write_trace(self, directory: Optional[str] = None) -> Optional[str]:
+        """Save the run as ``<job>-<UTC start>.json`` in ``directory`` or $SCRAPER_TRACE_DIR; None when unset."""
+        directory = directory or os.getenv("SCRAPER_TRACE_DIR")
+        if not directory:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.job_id}-{self.started_at:%Y%m%dT%H%M%SZ}.json")
+        trace = {
+            "traceEvents": self.trace_events(),
+            "displayTimeUnit": "ms",
+            "otherData": {"job_id": self.job_id, "started_at": self.started_at.isoformat()},
+        }
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(trace, file, ensure_ascii=False, default=str)
+        print(f"[INFO] Trace written to {path}")
+        return path
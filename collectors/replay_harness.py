@@ -0,0 +1,243 @@
+"""Record a scraper run once, then replay it offline as often as needed.
+
+Usage:
+    python collectors/replay_harness.py record --target nomura [--dir DIR]
+    python collectors/replay_harness.py replay --target nomura [--dir DIR]
+
+``record`` runs the scraper against the live portal with Supabase replaced
+by ``MockSupabase``. Every response of the browser context, including the
+login, home and detail HTML, is captured in ``<job_id>.har``. The login
+credentials found in the HAR are replaced by placeholders. The row the run
+would have written to monthly_balances is stored in ``<job_id>.json`` as
+the expected result.
+
+``replay`` runs the same scraper with the placeholders as credentials. The
+context serves every request from the HAR (nothing reaches the portal), and
+the written row is compared with the recorded one. Playwright replays the
+HAR inside the browser, so URLs, cookies and origins stay identical to the
+live run. Only Supabase needs a real local HTTP server.
+
+Recordings hold session cookies and account balances. DIR defaults to
+$SCRAPER_RECORDINGS_DIR or ~/.cache/flola/recordings, outside the repo.
+"""
+
+import argparse
+import asyncio
+import datetime
+import importlib
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, quote_plus
+
+from playwright.async_api import Browser
+
+import scraper_config
+from mock_supabase import MockSupabase
+from scraper_browser import har_path
+
+COMPARED_COLUMNS = ("record_date", "amount", "invested_amount")
+
+
+@dataclass(frozen=True)
+class ReplayTarget:
+    module: str
+    job_id: str
+    # Replaced by placeholders in the HAR and during replay.
+    secrets: Tuple[str, ...]
+    # Copied into the manifest so replay opens the same URLs.
+    settings: Tuple[str, ...] = ()
+
+
+TARGETS: Dict[str, ReplayTarget] = {
+    "nomura": ReplayTarget(
+        "nomura_scraper",
+        "scraper_nomura",
+        secrets=("NOMURA_LOGIN_ID", "NOMURA_PASSWORD"),
+        settings=("NOMURA_LOGIN_URL", "NOMURA_HOME_URL", "NOMURA_ACCOUNT_NAME"),
+    ),
+    "dc": ReplayTarget(
+        "dc_scraper",
+        "scraper_dc",
+        secrets=("PENSION_ACCOUNT_ID", "PENSION_PASSWORD"),
+        settings=("PENSION_START_URL",),
+    ),
+}
+
+
+def default_directory() -> str:
+    return os.getenv("SCRAPER_RECORDINGS_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "flola", "recordings")
+
+
+def placeholder(name: str) -> str:
+    return f"__{name}__"
+
+
+def manifest_path(directory: str, job_id: str) -> str:
+    return os.path.join(directory, f"{job_id}.json")
+
+
+def scrub(value: Any, replacements: List[Tuple[str, str]]) -> Any:
+    if isinstance(value, str):
+        for secret, replacement in replacements:
+            value = value.replace(secret, replacement)
+        return value
+    if isinstance(value, list):
+        return [scrub(item, replacements) for item in value]
+    if isinstance(value, dict):
+        return {key: scrub(item, replacements) for key, item in value.items()}
+    return value
+
+
+def scrub_har(path: str, secrets: Dict[str, str]) -> None:
+    """Replace every secret (raw and URL-encoded) in the HAR's text fields by its placeholder."""
+    replacements = []
+    for name, secret in secrets.items():
+        for form in {secret, quote(secret, safe=""), quote_plus(secret)}:
+            replacements.append((form, placeholder(name)))
+    # Longest first, so a secret that contains another one is replaced whole.
+    replacements.sort(key=lambda pair: len(pair[0]), reverse=True)
+    with open(path, encoding="utf-8") as file:
+        har = json.load(file)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(scrub(har, replacements), file, ensure_ascii=False)
+
+
+def comparable(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # account_id differs between mock instances, so only the extracted values are compared.
+    return sorted(({column: row.get(column) for column in COMPARED_COLUMNS} for row in rows), key=str)
+
+
+def point_at_mock(mock: MockSupabase) -> None:
+    # Drop a client (and telemetry sinks) created for an earlier mock in this process.
+    scraper_config.reset()
+    os.environ["SUPABASE_URL"] = mock.url
+    os.environ["SUPABASE_KEY"] = "mock-service-key"
+    # A saved session would skip the login that the recording (and the replay) must cover.
+    os.environ["SCRAPER_SESSIONS"] = "off"
+
+
+async def record(name: str, directory: str) -> str:
+    target = TARGETS[name]
+    scraper_config.load_env()
+    missing = [secret for secret in target.secrets if not os.getenv(secret)]
+    if missing:
+        raise ValueError(f"Missing environment variables: {', '.join(missing)}")
+    secrets = {secret: os.environ[secret] for secret in target.secrets}
+
+    with MockSupabase() as mock:
+        point_at_mock(mock)
+        os.environ["SCRAPER_RECORD_DIR"] = directory
+        try:
+            module = importlib.import_module(target.module)
+            await module.run()
+        finally:
+            os.environ.pop("SCRAPER_RECORD_DIR", None)
+        expected = comparable(mock.rows("monthly_balances"))
+
+    path = har_path(directory, target.job_id)
+    scrub_har(path, secrets)
+    manifest = {
+        "target": name,
+        "recorded_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "settings": {setting: os.environ[setting] for setting in target.settings if os.getenv(setting)},
+        "expected": expected,
+    }
+    with open(manifest_path(directory, target.job_id), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+    return path
+
+
+@dataclass
+class ReplayResult:
+    target: str
+    seconds: float
+    expected: List[Dict[str, Any]]
+    actual: List[Dict[str, Any]]
+    phases: Dict[str, int] = field(default_factory=dict)
+    supabase_requests: int = 0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.actual == self.expected
+
+
+class ReplaySession:
+    """One target's recording, a mock Supabase and the imported scraper, reusable for many runs."""
+
+    def __init__(self, name: str, directory: str):
+        self.name = name
+        self.target = TARGETS[name]
+        self.directory = directory
+        with open(manifest_path(directory, self.target.job_id), encoding="utf-8") as file:
+            self.manifest = json.load(file)
+        self.mock = MockSupabase()
+        self.module = None
+
+    def __enter__(self) -> "ReplaySession":
+        self.mock.start()
+        point_at_mock(self.mock)
+        os.environ.update(self.manifest.get("settings", {}))
+        for secret in self.target.secrets:
+            os.environ[secret] = placeholder(secret)
+        os.environ["SCRAPER_REPLAY_DIR"] = self.directory
+        # The scrapers cache their settings on first use, so a module used earlier (by record) is reloaded.
+        loaded = sys.modules.get(self.target.module)
+        self.module = importlib.reload(loaded) if loaded else importlib.import_module(self.target.module)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        os.environ.pop("SCRAPER_REPLAY_DIR", None)
+        self.mock.stop()
+
+    async def run(self, browser: Optional[Browser] = None) -> ReplayResult:
+        self.mock.reset()
+        error = None
+        started = time.perf_counter()
+        try:
+            await self.module.run(browser)
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+        seconds = time.perf_counter() - started
+
+        phases: Dict[str, int] = {}
+        for row in self.mock.rows("system_logs"):
+            timing = (row.get("metadata") or {}).get("timing")
+            if timing:
+                phases = {phase["name"]: phase["ms"] for phase in timing["phases"]}
+        return ReplayResult(
+            self.name,
+            seconds,
+            self.manifest["expected"],
+            comparable(self.mock.rows("monthly_balances")),
+            phases,
+            len(self.mock.requests),
+            error,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["record", "replay"])
+    parser.add_argument("--target", choices=list(TARGETS), required=True)
+    parser.add_argument("--dir", default=default_directory())
+    args = parser.parse_args()
+
+    if args.command == "record":
+        path = asyncio.run(record(args.target, args.dir))
+        print(f"[INFO] Recorded {args.target} to {path}")
+        return
+
+    with ReplaySession(args.target, args.dir) as session:
+        result = asyncio.run(session.run())
+    status = "matches the recording" if result.ok else f"differs: {result.error or result.actual}"
+    print(f"[INFO] {args.target} replay in {result.seconds:.2f}s {status}; phases {result.phases}")
+    sys.exit(0 if result.ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Phase-level retries for the scrapers, on the same context and session.
+
+``Retrier.call`` re-runs one step (an async callable taking the attempt
+number) when it raises a transient error (Playwright timeouts and network
+errors, or a ``WaitTimeout`` from the wait engine) or when ``retry_if``
+rejects its result. Between attempts it sleeps with full-jitter exponential
+backoff. It stops when the attempts run out or when the next attempt would
+not fit in the time budget, whichever comes first. A ``WaitFailed``
+(e.g. the portal showing a login error) is never retried.
+
+``SCRAPER_RETRY_ATTEMPTS`` and ``SCRAPER_RETRY_BUDGET_SECONDS`` override the
+defaults.
+"""
+
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type, TypeVar
+
+from playwright.async_api import Error as PlaywrightError
+
+from wait_engine import WaitTimeout
+
+T = TypeVar("T")
+
+DEFAULT_RETRY_ON: Tuple[Type[BaseException], ...] = (PlaywrightError, WaitTimeout)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 10.0
+    # Wall time from the first attempt after which no new attempt is started.
+    budget_seconds: float = 60.0
+    # An attempt is only started when at least this much of the budget is left after the backoff.
+    min_attempt_seconds: float = 5.0
+    retry_on: Tuple[Type[BaseException], ...] = DEFAULT_RETRY_ON
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(
+            attempts=int(os.getenv("SCRAPER_RETRY_ATTEMPTS", cls.attempts)),
+            budget_seconds=float(os.getenv("SCRAPER_RETRY_BUDGET_SECONDS", cls.budget_seconds)),
+        )
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class Retrier:
+    def __init__(self, policy: Optional[RetryPolicy] = None, remaining: Optional[Callable[[], float]] = None):
+        """``remaining`` (e.g. ``WaitEngine.remaining``) further caps the budget by the run's deadline."""
+        self.policy = policy or RetryPolicy.from_env()
+        self.remaining = remaining
+        self.started = time.monotonic()
+        self.retries: Dict[str, int] = {}
+        self.history: List[Dict[str, Any]] = []
+
+    def budget_left(self) -> float:
+        left = self.policy.budget_seconds - (time.monotonic() - self.started)
+        if self.remaining is not None:
+            left = min(left, self.remaining())
+        return left
+
+    def _should_retry(self, step: str, attempt: int, reason: str) -> Optional[float]:
+        """Record the failed attempt; the backoff delay when another attempt fits, else None."""
+        delay = self.policy.backoff(attempt)
+        retry = attempt < self.policy.attempts and delay + self.policy.min_attempt_seconds <= self.budget_left()
+        self.history.append({"step": step, "attempt": attempt, "reason": reason[:200], "retried": retry})
+        if not retry:
+            return None
+        self.retries[step] = self.retries.get(step, 0) + 1
+        print(f"[WARNING] {step} attempt {attempt} failed ({reason}); retrying in {delay:.1f}s")
+        return delay
+
+    async def call(
+        self,
+        step: str,
+        action: Callable[[int], Awaitable[T]],
+        retry_if: Optional[Callable[[T], bool]] = None,
+    ) -> T:
+        """Run ``action(attempt)``; the last attempt's exception or result is passed through as is."""
+        attempt = 1
+        while True:
+            try:
+                result = await action(attempt)
+            except self.policy.retry_on as error:
+                delay = self._should_retry(step, attempt, f"{type(error).__name__}: {error}")
+                if delay is None:
+                    raise
+            else:
+                if retry_if is None or not retry_if(result):
+                    return result
+                delay = self._should_retry(step, attempt, "result rejected")
+                if delay is None:
+                    return result
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def as_metadata(self) -> Dict[str, Any]:
+        return {"retries": dict(self.retries), "attempts": list(self.history)}
@@ -0,0 +1,297 @@
+"""Long-running scheduler that runs each collector on its own cadence.
+
+Usage:
+    python collectors/scheduler.py [--target all|nomura|dc] [--once]
+
+Each collector declares a ``Cadence`` (time of day and weekdays, Tokyo
+time). ``SCRAPER_SCHEDULE_<NAME>=HH:MM`` overrides the time, for example
+``SCRAPER_SCHEDULE_DC=11:15``. A day's run is its *slot*. The slot fires
+at the cadence time plus a jitter of up to ``jitter_minutes``. The jitter
+is derived from the collector and the date, so a restarted daemon picks
+the same minute again.
+
+The daemon works as follows:
+
+* At most ``SCRAPER_MAX_BROWSER_JOBS`` collectors (default 2) run at once.
+  They share one warm Chromium that is launched on the first run, relaunched
+  if it dies, and closed after ``SCRAPER_BROWSER_IDLE_SECONDS`` without
+  work. The per-host limit of collector_engine.py still applies.
+* Every slot is written to a local run ledger (``SCRAPER_LEDGER_PATH``)
+  before it starts. Neither a second daemon nor a restart runs a finished
+  slot again. A failed slot is retried after ``RETRY_DELAY`` until it has
+  used ``SCRAPER_SCHEDULER_MAX_ATTEMPTS`` attempts (default 2).
+* Only the latest slot of each collector is considered. After downtime, one
+  run catches up; missed days are not replayed, because today's balance
+  supersedes them.
+
+``--once`` runs whatever is due and exits. It suits an external cron that
+fires more often than the cadences.
+
+Weekends are skipped but Japanese holidays are not. A holiday run finds the
+previous valuation and ends as ``skipped_unchanged``.
+"""
+
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+import os
+import random
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Set
+
+from playwright.async_api import Browser, async_playwright
+
+from collector_engine import COLLECTORS, Cadence, load_collector, run_collector
+from scraper_browser import launch_browser
+
+try:
+    import fcntl
+except ImportError:  # Windows: the ledger still prevents duplicate slots, only the single-daemon lock is skipped.
+    fcntl = None
+
+# Japan has no DST, so a fixed offset needs no tz database (Windows has none unless tzdata is installed).
+TOKYO = datetime.timezone(datetime.timedelta(hours=9), "JST")
+TICK_SECONDS = 30.0
+RETRY_DELAY = datetime.timedelta(minutes=15)
+# A "running" entry older than this was left behind by a daemon that died mid-run.
+STALE_RUN = datetime.timedelta(hours=1)
+DONE_STATUSES = ("success", "skipped_unchanged")
+
+
+def cadence_for(name: str) -> Cadence:
+    cadence = load_collector(name).cadence
+    override = os.getenv(f"SCRAPER_SCHEDULE_{name.upper()}")
+    if not override:
+        return cadence
+    hour, minute = (int(part) for part in override.split(":"))
+    return Cadence(datetime.time(hour, minute), cadence.weekdays, cadence.jitter_minutes)
+
+
+def latest_slot(cadence: Cadence, now: datetime.datetime) -> Optional[datetime.datetime]:
+    """The most recent cadence time at or before ``now`` (both in Tokyo time)."""
+    for days_back in range(8):
+        day = now.date() - datetime.timedelta(days=days_back)
+        slot = datetime.datetime.combine(day, cadence.at, tzinfo=TOKYO)
+        if day.weekday() in cadence.weekdays and slot <= now:
+            return slot
+    return None
+
+
+def jitter(name: str, slot: datetime.datetime, cadence: Cadence) -> datetime.timedelta:
+    seed = hashlib.sha256(f"{name}:{slot.date().isoformat()}".encode()).hexdigest()
+    return datetime.timedelta(minutes=random.Random(seed).uniform(0, cadence.jitter_minutes))
+
+
+@dataclass
+class LedgerEntry:
+    slot: str
+    status: str
+    attempts: int
+    started_at: str
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+
+
+class RunLedger:
+    """Last slot of every collector and how it went, kept in a small JSON file."""
+
+    def __init__(self, path: Optional[str] = None, max_attempts: Optional[int] = None):
+        self.path = path or os.getenv("SCRAPER_LEDGER_PATH") or os.path.join(
+            os.path.expanduser("~"), ".cache", "flola", "scheduler", "ledger.json"
+        )
+        self.max_attempts = max_attempts or int(os.getenv("SCRAPER_SCHEDULER_MAX_ATTEMPTS", "2"))
+        self.entries: Dict[str, LedgerEntry] = {}
+        self._lock_file = None
+
+    def lock(self) -> None:
+        """Hold an exclusive lock next to the ledger for the life of the process; fails if another daemon has it."""
+        if fcntl is None:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock_file = open(self.path + ".lock", "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            raise RuntimeError(f"Another scheduler is already using {self.path}.")
+
+    def load(self) -> Dict[str, LedgerEntry]:
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                saved = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return self.entries
+        self.entries = {name: LedgerEntry(**entry) for name, entry in saved.items()}
+        return self.entries
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({name: asdict(entry) for name, entry in self.entries.items()}, file, indent=2)
+        os.replace(temp_path, self.path)
+
+    def allows(self, name: str, slot: str, now: datetime.datetime) -> bool:
+        entry = self.entries.get(name)
+        if entry is None or entry.slot != slot:
+            return True
+        if entry.status in DONE_STATUSES or entry.attempts >= self.max_attempts:
+            return False
+        if entry.status == "running":
+            return now - datetime.datetime.fromisoformat(entry.started_at) > STALE_RUN
+        return now - datetime.datetime.fromisoformat(entry.finished_at or entry.started_at) > RETRY_DELAY
+
+    def start(self, name: str, slot: str, now: datetime.datetime) -> None:
+        entry = self.entries.get(name)
+        attempts = entry.attempts + 1 if entry is not None and entry.slot == slot else 1
+        self.entries[name] = LedgerEntry(slot, "running", attempts, now.isoformat())
+        self._save()
+
+    def finish(self, name: str, status: str, now: datetime.datetime, error: Optional[str] = None) -> None:
+        entry = self.entries[name]
+        entry.status = status
+        entry.finished_at = now.isoformat()
+        entry.error = error
+        self._save()
+
+
+class WarmBrowser:
+    """One Chromium shared by every run, launched on demand and closed after a long idle spell."""
+
+    def __init__(self, playwright, idle_seconds: Optional[float] = None):
+        self.playwright = playwright
+        self.idle_seconds = idle_seconds or float(os.getenv("SCRAPER_BROWSER_IDLE_SECONDS", "1800"))
+        self.browser: Optional[Browser] = None
+        self.users = 0
+        self.idle_since = time.monotonic()
+        self._launching = asyncio.Lock()
+
+    async def acquire(self) -> Browser:
+        async with self._launching:
+            if self.browser is None or not self.browser.is_connected():
+                started = time.perf_counter()
+                self.browser = await launch_browser(self.playwright)
+                print(f"[INFO] Browser launched in {time.perf_counter() - started:.1f}s")
+            self.users += 1
+            return self.browser
+
+    def release(self) -> None:
+        self.users -= 1
+        if self.users == 0:
+            self.idle_since = time.monotonic()
+
+    async def close_if_idle(self) -> None:
+        if self.browser is not None and self.users == 0 and time.monotonic() - self.idle_since > self.idle_seconds:
+            await self.close()
+
+    async def close(self) -> None:
+        if self.browser is not None:
+            browser, self.browser = self.browser, None
+            await browser.close()
+
+
+class Scheduler:
+    def __init__(self, names: List[str], ledger: RunLedger, max_browser_jobs: Optional[int] = None):
+        self.names = names
+        self.ledger = ledger
+        self.cadences = {name: cadence_for(name) for name in names}
+        self.max_browser_jobs = max_browser_jobs or int(os.getenv("SCRAPER_MAX_BROWSER_JOBS", "2"))
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.running: Set[str] = set()
+        self.tasks: Set["asyncio.Task[None]"] = set()
+        self.browser: Optional[WarmBrowser] = None
+
+    def due(self, name: str, now: datetime.datetime) -> Optional[str]:
+        """The slot ``name`` should run now, if any."""
+        if name in self.running:
+            return None
+        cadence = self.cadences[name]
+        slot = latest_slot(cadence, now)
+        if slot is None or now < slot + jitter(name, slot, cadence):
+            return None
+        key = slot.date().isoformat()
+        return key if self.ledger.allows(name, key, now) else None
+
+    def next_run(self, name: str, now: datetime.datetime) -> datetime.datetime:
+        cadence = self.cadences[name]
+        for days_ahead in range(8):
+            day = now.date() + datetime.timedelta(days=days_ahead)
+            slot = datetime.datetime.combine(day, cadence.at, tzinfo=TOKYO)
+            fire_at = slot + jitter(name, slot, cadence)
+            if day.weekday() in cadence.weekdays and fire_at > now:
+                return fire_at
+        raise ValueError(f"{name} has no weekdays in its cadence.")
+
+    def start_due(self) -> None:
+        now = datetime.datetime.now(TOKYO)
+        for name in self.names:
+            slot = self.due(name, now)
+            if slot is None:
+                continue
+            # Written before the task starts, so the next tick (or another daemon reading the ledger) skips it.
+            self.ledger.start(name, slot, now)
+            self.running.add(name)
+            task = asyncio.ensure_future(self.run(name, slot))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def run(self, name: str, slot: str) -> None:
+        try:
+            async with self.slots:
+                browser = await self.browser.acquire()
+                print(f"[INFO] {name}: running slot {slot}")
+                try:
+                    status = await run_collector(load_collector(name), browser)
+                except Exception as error:
+                    self.ledger.finish(name, "failed", datetime.datetime.now(TOKYO), f"{type(error).__name__}: {error}")
+                    print(f"[ERROR] {name}: slot {slot} failed ({error})")
+                else:
+                    self.ledger.finish(name, status, datetime.datetime.now(TOKYO))
+                    print(f"[INFO] {name}: slot {slot} {status}")
+                finally:
+                    self.browser.release()
+        finally:
+            self.running.discard(name)
+
+    async def serve(self, once: bool = False) -> None:
+        self.ledger.lock()
+        self.ledger.load()
+        now = datetime.datetime.now(TOKYO)
+        for name in self.names:
+            print(f"[INFO] {name}: next run {self.next_run(name, now):%Y-%m-%d %H:%M %Z}")
+
+        # Created here rather than in __init__: before Python 3.10 a semaphore binds to the loop current at creation.
+        self.slots = asyncio.Semaphore(self.max_browser_jobs)
+        async with async_playwright() as playwright:
+            self.browser = WarmBrowser(playwright)
+            try:
+                while True:
+                    self.start_due()
+                    if once:
+                        await asyncio.gather(*self.tasks)
+                        return
+                    await asyncio.sleep(TICK_SECONDS)
+                    await self.browser.close_if_idle()
+            finally:
+                for task in self.tasks:
+                    task.cancel()
+                await asyncio.gather(*self.tasks, return_exceptions=True)
+                await self.browser.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", choices=["all", *COLLECTORS], default="all")
+    parser.add_argument("--once", action="store_true", help="run whatever is due, then exit")
+    args = parser.parse_args()
+    names = list(COLLECTORS) if args.target == "all" else [args.target]
+    try:
+        asyncio.run(Scheduler(names, RunLedger()).serve(args.once))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+from playwright.async_api import Browser, BrowserContext, async_playwright
+
+
+async def launch_browser(playwright) -> Browser:
+    return await playwright.chromium.launch(headless=True)
+
+
+@asynccontextmanager
+async def use_browser(browser: Optional[Browser] = None) -> AsyncIterator[Browser]:
+    """Yield ``browser`` when the caller shares one, otherwise launch and close a private one."""
+    if browser is not None:
+        yield browser
+        return
+
+    async with async_playwright() as playwright:
+        own_browser = await launch_browser(playwright)
+        try:
+            yield own_browser
+        finally:
+            await own_browser.close()
+
+
+def har_path(directory: str, job_id: str) -> str:
+    return os.path.join(directory, f"{job_id}.har")
+
+
+async def new_context(browser: Browser, job_id: str, **options: Any) -> BrowserContext:
+    """``browser.new_context`` with the offline hooks of replay_harness.py.
+
+    ``SCRAPER_RECORD_DIR`` records the context's traffic to ``<job_id>.har``
+    (written when the context closes); ``SCRAPER_REPLAY_DIR`` serves every
+    request from that file instead of the network and aborts the rest.
+    """
+    record_dir = os.getenv("SCRAPER_RECORD_DIR")
+    if record_dir:
+        os.makedirs(record_dir, exist_ok=True)
+        options.update(record_har_path=har_path(record_dir, job_id), record_har_content="embed")
+    context = await browser.new_context(**options)
+    replay_dir = os.getenv("SCRAPER_REPLAY_DIR")
+    if replay_dir:
+        await context.route_from_har(har_path(replay_dir, job_id), not_found="abort")
+    return context
@@ -0,0 +1,90 @@
+"""Lazy settings and shared clients for the collectors.
+
+Importing a collector has no side effects. ``.env`` is loaded the first time
+a setting is read, and environment variables are validated by the code
+that needs them. The Supabase client, each job's TelemetrySink and the
+session store are built on first use and then shared by everything in the
+process. A runner that imports both scrapers therefore creates one client,
+and a test or benchmark can import a scraper without credentials.
+"""
+
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Optional
+
+from session_store import SessionStore, open_session_store
+from telemetry import TelemetrySink
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+_lock = threading.RLock()
+_env_loaded = False
+_client: Optional["Client"] = None
+_telemetry: Dict[str, TelemetrySink] = {}
+_session_store: Optional[SessionStore] = None
+_session_store_opened = False
+
+
+def load_env() -> None:
+    global _env_loaded
+    with _lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            _env_loaded = True
+
+
+def env(name: str, default: Optional[str] = None) -> Optional[str]:
+    load_env()
+    return os.getenv(name, default)
+
+
+def require_env(*names: str) -> Dict[str, str]:
+    load_env()
+    missing = [name for name in names if not os.getenv(name)]
+    if missing:
+        raise ValueError(f"Missing environment variables: {', '.join(missing)}.")
+    return {name: os.environ[name] for name in names}
+
+
+def get_supabase() -> "Client":
+    """The process-wide Supabase client, created (and SUPABASE_URL/KEY checked) on first use."""
+    global _client
+    with _lock:
+        if _client is None:
+            settings = require_env("SUPABASE_URL", "SUPABASE_KEY")
+            from supabase import create_client
+
+            _client = create_client(settings["SUPABASE_URL"], settings["SUPABASE_KEY"])
+        return _client
+
+
+def get_telemetry(source: str) -> TelemetrySink:
+    with _lock:
+        if source not in _telemetry:
+            _telemetry[source] = TelemetrySink(get_supabase(), source)
+        return _telemetry[source]
+
+
+def get_session_store() -> Optional[SessionStore]:
+    global _session_store, _session_store_opened
+    with _lock:
+        if not _session_store_opened:
+            load_env()
+            _session_store = open_session_store()
+            _session_store_opened = True
+        return _session_store
+
+
+def reset() -> None:
+    """Flush and forget everything cached, e.g. after SUPABASE_URL was pointed elsewhere."""
+    global _client, _session_store, _session_store_opened
+    with _lock:
+        for sink in _telemetry.values():
+            sink.close()
+        _telemetry.clear()
+        _client = None
+        _session_store = None
+        _session_store_opened = False
@@ -0,0 +1,108 @@
+"""Run the investment scrapers in one process, sharing a single Chromium.
+
+Usage:
+    python collectors/scraper_runner.py [--target all|nomura|dc] [--sequential]
+
+Each selected scraper gets its own BrowserContext on the shared browser and
+the jobs run concurrently; every job still writes its own job_status row and
+system_logs entries, and one job failing does not cancel the others.
+Jobs on the same portal host still wait for each other (see
+``SCRAPER_MAX_PER_HOST`` in collector_engine.py).
+``--sequential`` runs the jobs one after another with a browser each (the
+previous two-process behaviour) for comparison.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from playwright.async_api import Browser, async_playwright
+
+from collector_engine import COLLECTORS, load_collector, run_collector
+from scraper_browser import launch_browser
+
+
+@dataclass
+class JobResult:
+    name: str
+    elapsed: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def resolve_targets(target: str) -> List[str]:
+    return list(COLLECTORS) if target == "all" else [target]
+
+
+async def run_job(name: str, browser: Optional[Browser]) -> JobResult:
+    started = time.perf_counter()
+    try:
+        # Imported on demand, so running one target never loads the other collector.
+        await run_collector(load_collector(name), browser)
+    except Exception as error:
+        return JobResult(name, time.perf_counter() - started, f"{type(error).__name__}: {error}")
+    return JobResult(name, time.perf_counter() - started)
+
+
+async def run_shared(names: List[str]) -> Tuple[float, List[JobResult]]:
+    """Launch one browser and run every job concurrently on it; also returns the launch time."""
+    async with async_playwright() as playwright:
+        started = time.perf_counter()
+        browser = await launch_browser(playwright)
+        launch_elapsed = time.perf_counter() - started
+        try:
+            results = list(await asyncio.gather(*(run_job(name, browser) for name in names)))
+        finally:
+            await browser.close()
+    return launch_elapsed, results
+
+
+async def run_sequential(names: List[str]) -> List[JobResult]:
+    return [await run_job(name, None) for name in names]
+
+
+def report(results: List[JobResult], wall: float, launch_elapsed: Optional[float]) -> None:
+    for result in results:
+        status = "success" if result.ok else f"failed ({result.error})"
+        print(f"[INFO] {result.name}: {status} in {result.elapsed:.1f}s")
+
+    if launch_elapsed is None:
+        print(f"[INFO] Sequential wall time: {wall:.1f}s")
+        return
+
+    # Without the shared browser every job pays its own launch and runs after the previous one.
+    sequential = sum(result.elapsed for result in results) + launch_elapsed * len(results)
+    print(
+        f"[INFO] Wall time: {wall:.1f}s (browser launch {launch_elapsed:.1f}s), "
+        f"sequential baseline ~{sequential:.1f}s, saved ~{max(0.0, sequential - wall):.1f}s"
+    )
+
+
+async def main_async(target: str, sequential: bool) -> int:
+    names = resolve_targets(target)
+    started = time.perf_counter()
+    if sequential:
+        launch_elapsed = None
+        results = await run_sequential(names)
+    else:
+        launch_elapsed, results = await run_shared(names)
+    report(results, time.perf_counter() - started, launch_elapsed)
+    return 0 if all(result.ok for result in results) else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", choices=["all", *COLLECTORS], default="all")
+    parser.add_argument("--sequential", action="store_true", help="one browser per job, run one after another")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args.target, args.sequential)))
+
+
+if __name__ == "__main__":
+    main()
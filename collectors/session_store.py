@@ -0,0 +1,109 @@
+"""Encrypted, per-institution Playwright storage_state files.
+
+Usage:
+    python collectors/session_store.py --generate-key
+
+Sessions are only reused when ``SCRAPER_SESSION_KEY`` holds a Fernet key;
+without it (or with ``SCRAPER_SESSIONS=off``) every run logs in from scratch.
+Files live in ``SCRAPER_SESSION_DIR`` (default ``~/.cache/flola/sessions``)
+and are ignored once older than ``SCRAPER_SESSION_MAX_AGE`` seconds.
+The engine adds ``landing_url``, the page the login landed on, to the saved
+state; a resumed session is checked there.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+
+DEFAULT_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+
+
+def default_session_dir() -> str:
+    return os.getenv("SCRAPER_SESSION_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "flola", "sessions")
+
+
+class SessionStore:
+    def __init__(self, directory: str, key: bytes, max_age: int = DEFAULT_MAX_AGE_SECONDS):
+        self.directory = directory
+        self.max_age = max_age
+        self._fernet = Fernet(key)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.session")
+
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        """Return the saved storage_state for ``name``, or None if missing, expired or unreadable."""
+        try:
+            with open(self._path(name), "rb") as file:
+                token = file.read()
+            return json.loads(self._fernet.decrypt(token, ttl=self.max_age))
+        except FileNotFoundError:
+            return None
+        except (InvalidToken, ValueError):
+            self.discard(name)
+            return None
+
+    def save(self, name: str, state: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        token = self._fernet.encrypt(json.dumps(state).encode("utf-8"))
+        descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(token)
+            os.chmod(temp_path, 0o600)
+            os.replace(temp_path, self._path(name))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def discard(self, name: str) -> None:
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
+
+
+def open_session_store() -> Optional[SessionStore]:
+    key = os.getenv("SCRAPER_SESSION_KEY")
+    if not key or os.getenv("SCRAPER_SESSIONS", "").lower() in {"0", "off", "false", "no"}:
+        return None
+    if Fernet is None:
+        print("[INFO] cryptography is not installed; login sessions are not reused.")
+        return None
+    max_age = int(os.getenv("SCRAPER_SESSION_MAX_AGE", str(DEFAULT_MAX_AGE_SECONDS)))
+    try:
+        return SessionStore(default_session_dir(), key.encode("ascii"), max_age)
+    except ValueError:
+        print("[INFO] SCRAPER_SESSION_KEY is not a valid Fernet key; login sessions are not reused.")
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--generate-key", action="store_true", help="print a new SCRAPER_SESSION_KEY")
+    parser.add_argument("--clear", metavar="NAME", help="delete the saved session for a job id")
+    args = parser.parse_args()
+
+    if args.generate_key:
+        if Fernet is None:
+            raise SystemExit("cryptography is not installed.")
+        print(Fernet.generate_key().decode("ascii"))
+    elif args.clear:
+        store = open_session_store()
+        if store is None:
+            raise SystemExit("Session reuse is disabled (SCRAPER_SESSION_KEY is not set).")
+        store.discard(args.clear)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
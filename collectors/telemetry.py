@@ -0,0 +1,133 @@
+"""Buffered system_logs / job_status writer for the async scrapers.
+
+The supabase client is synchronous, so calling ``.execute()`` from a
+coroutine blocks the event loop (and every Playwright page on it) for a
+whole HTTP round trip. ``TelemetrySink`` only appends to a bounded queue;
+a daemon thread sends the rows in bulk, one insert for all queued
+system_logs rows and one upsert for the latest status of each job.
+``flush()`` waits for everything queued so far and is awaited at the end
+of every run; an atexit hook covers anything still pending.
+"""
+
+import asyncio
+import atexit
+import datetime
+import queue
+import sys
+import threading
+from typing import Any, Dict, List, Optional
+
+DEFAULT_MAX_QUEUE = 1000
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_BATCH_SIZE = 100
+
+
+def utc_now() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+class TelemetrySink:
+    def __init__(
+        self,
+        client,
+        source: str,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ):
+        self.client = client
+        self.source = source
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._logs: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._statuses: Dict[str, Dict[str, Any]] = {}
+        self._status_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"telemetry-{source}", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, level: str, message: str, metadata: Optional[dict] = None) -> None:
+        """Print the line and queue the system_logs row; never waits on the network."""
+        print(f"[{level.upper()}] {message}")
+        row = {
+            "timestamp": utc_now(),
+            "source": self.source,
+            "level": level,
+            "message": message,
+            "metadata": metadata,
+        }
+        try:
+            self._logs.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._logs.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def status(self, status: str, message: str = "") -> None:
+        """Queue a job_status upsert; only the latest status per job is sent."""
+        with self._status_lock:
+            self._statuses[self.source] = {
+                "job_id": self.source,
+                "last_run_at": utc_now(),
+                "last_status": status,
+                "message": message,
+            }
+        self._wake.set()
+
+    async def flush(self) -> None:
+        """Send everything queued so far without blocking the event loop."""
+        await asyncio.get_running_loop().run_in_executor(None, self.flush_sync)
+
+    def flush_sync(self) -> None:
+        with self._send_lock:
+            self._send_logs()
+            self._send_statuses()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=10)
+        self.flush_sync()
+        if self.dropped:
+            print(f"[WARNING] {self.source}: {self.dropped} log rows dropped (queue full).", file=sys.stderr)
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush_sync()
+
+    def _drain_logs(self) -> List[Dict[str, Any]]:
+        rows = []
+        while True:
+            try:
+                rows.append(self._logs.get_nowait())
+            except queue.Empty:
+                return rows
+
+    def _send_logs(self) -> None:
+        rows = self._drain_logs()
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            try:
+                self.client.table("system_logs").insert(batch).execute()
+            except Exception as error:
+                print(f"[WARNING] {self.source}: could not write {len(batch)} log rows: {error}", file=sys.stderr)
+
+    def _send_statuses(self) -> None:
+        with self._status_lock:
+            statuses = list(self._statuses.values())
+            self._statuses.clear()
+        if not statuses:
+            return
+        try:
+            self.client.table("job_status").upsert(statuses).execute()
+        except Exception as error:
+            print(f"[WARNING] {self.source}: could not write job status: {error}", file=sys.stderr)
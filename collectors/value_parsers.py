@@ -0,0 +1,33 @@
+"""Amount and date parsers shared by every collector's extraction spec."""
+
+import datetime
+import re
+import unicodedata
+from typing import Optional
+
+NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+JAPANESE_DATE_PATTERN = re.compile(r"(20\d{2})\s*年\s*([01]?\d)\s*月\s*([0-3]?\d)\s*日")
+
+
+def parse_amount(text: Optional[str]) -> int:
+    """First number in ``text`` as whole yen: ``"1,234,567円"``, ``"¥ 1,234.5"``, ``"－12,000"``; 0 if none."""
+    if not text:
+        return 0
+    # NFKC folds full-width digits and the full-width minus used by some portals.
+    normalized = unicodedata.normalize("NFKC", text).replace(",", "").replace("−", "-")
+    matched = NUMBER_PATTERN.search(normalized)
+    if not matched:
+        return 0
+    return int(float(matched.group(0)))
+
+
+def parse_japanese_date(text: Optional[str]) -> str:
+    """``2025年1月31日`` as ISO ``2025-01-31``; today when ``text`` has no such date."""
+    match = JAPANESE_DATE_PATTERN.search(unicodedata.normalize("NFKC", text or ""))
+    if not match:
+        return datetime.date.today().isoformat()
+    year, month, day = (int(match.group(i)) for i in range(1, 4))
+    try:
+        return datetime.date(year, month, day).isoformat()
+    except ValueError:
+        return datetime.date.today().isoformat()
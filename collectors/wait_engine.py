@@ -0,0 +1,136 @@
+"""Race success selectors against failure signals instead of sleeping.
+
+``WaitEngine.race`` resolves as soon as any signal matches. All signals are
+checked in one ``page.wait_for_function`` predicate, which polls inside the
+page on every animation frame and survives navigations. Every race is
+bounded by the engine's overall deadline, and the winning signal is recorded
+in ``history`` for the run's log metadata.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from playwright.async_api import Page
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+# Returns the index of the first matching signal, or false to keep polling.
+RACE_SCRIPT = """
+  (signals) => {
+    const visible = (element) =>
+      !!element && !!(element.offsetWidth || element.offsetHeight || element.getClientRects().length)
+    for (let index = 0; index < signals.length; index++) {
+      const signal = signals[index]
+      if (signal.selector) {
+        const element = document.querySelector(signal.selector)
+        if (signal.state === 'attached' ? element : visible(element)) return { index }
+      } else if (signal.absent) {
+        if (!document.querySelector(signal.absent)) return { index }
+      } else if (signal.text) {
+        if ((document.body?.textContent || '').includes(signal.text)) return { index }
+      }
+    }
+    return false
+  }
+"""
+
+
+@dataclass(frozen=True)
+class WaitSignal:
+    """One condition in a race; exactly one of ``selector``, ``absent`` or ``text`` is set."""
+
+    name: str
+    selector: Optional[str] = None
+    absent: Optional[str] = None
+    text: Optional[str] = None
+    state: str = "visible"
+    failure: bool = False
+
+    def as_js(self) -> Dict[str, Any]:
+        return {"selector": self.selector, "absent": self.absent, "text": self.text, "state": self.state}
+
+
+def success(name: str, selector: str, state: str = "visible") -> WaitSignal:
+    return WaitSignal(name, selector=selector, state=state)
+
+
+def failure(name: str, selector: str, state: str = "visible") -> WaitSignal:
+    return WaitSignal(name, selector=selector, state=state, failure=True)
+
+
+def gone(name: str, selector: str, is_failure: bool = False) -> WaitSignal:
+    return WaitSignal(name, absent=selector, failure=is_failure)
+
+
+def text_appears(name: str, text: str) -> WaitSignal:
+    return WaitSignal(name, text=text)
+
+
+@dataclass
+class WaitOutcome:
+    wait: str
+    signal: Optional[WaitSignal]
+    elapsed: float
+
+    @property
+    def ok(self) -> bool:
+        return self.signal is not None and not self.signal.failure
+
+    @property
+    def winner(self) -> str:
+        return self.signal.name if self.signal is not None else "timeout"
+
+
+class WaitTimeout(RuntimeError):
+    def __init__(self, outcome: WaitOutcome, signals: Sequence[WaitSignal]):
+        names = ", ".join(signal.name for signal in signals)
+        super().__init__(f"Timed out after {outcome.elapsed:.1f}s waiting for {outcome.wait} ({names}).")
+        self.outcome = outcome
+
+
+class WaitFailed(RuntimeError):
+    def __init__(self, outcome: WaitOutcome):
+        super().__init__(f"{outcome.wait} failed: {outcome.winner}.")
+        self.outcome = outcome
+
+
+class WaitEngine:
+    def __init__(self, page: Page, deadline_seconds: float = 120.0):
+        self.page = page
+        self.deadline = time.monotonic() + deadline_seconds
+        self.history: List[Dict[str, Any]] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    async def race(
+        self,
+        wait: str,
+        signals: Sequence[WaitSignal],
+        timeout: float = 30.0,
+        raise_on_failure: bool = True,
+        raise_on_timeout: bool = True,
+    ) -> WaitOutcome:
+        """Wait until one of ``signals`` matches; ``timeout`` is capped by the overall deadline."""
+        started = time.monotonic()
+        budget = min(timeout, self.remaining())
+        winner: Optional[WaitSignal] = None
+        if budget > 0:
+            try:
+                handle = await self.page.wait_for_function(
+                    RACE_SCRIPT,
+                    arg=[signal.as_js() for signal in signals],
+                    polling="raf",
+                    timeout=budget * 1000,
+                )
+                winner = signals[(await handle.json_value())["index"]]
+            except PlaywrightTimeoutError:
+                pass
+
+        outcome = WaitOutcome(wait, winner, time.monotonic() - started)
+        self.history.append({"wait": wait, "signal": outcome.winner, "seconds": round(outcome.elapsed, 3)})
+        if winner is None and raise_on_timeout:
+            raise WaitTimeout(outcome, signals)
+        if winner is not None and winner.failure and raise_on_failure:
+            raise WaitFailed(outcome)
+        return outcome
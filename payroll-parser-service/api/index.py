@@ -1,138 +1,297 @@
 import json
-import re
+import os
+import sys
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from email.parser import BytesParser
+from email.policy import HTTP
 from http.server import BaseHTTPRequestHandler
 from io import BytesIO
-from typing import Optional
+from typing import BinaryIO, Dict, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
 
-import fitz
+COLLECTORS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "collectors")
+if os.path.isdir(COLLECTORS_DIR) and COLLECTORS_DIR not in sys.path:
+    sys.path.append(COLLECTORS_DIR)
 
-MONTH_PATTERN = re.compile(r"(20\d{2})\s*年\s*([01]?\d)\s*月")
-INLINE_NUMBER_PATTERN = re.compile(r"([^:：\n]+?)\s*[:：]\s*([+-]?[0-9][0-9,]*(?:\.\d+)?)")
-TRAILING_NUMBER_PATTERN = re.compile(r"^(.+?)(?:[:：\s]+)([+-]?[0-9][0-9,]*(?:\.\d+)?)$")
-NUMBER_ONLY_PATTERN = re.compile(r"^[+-]?[0-9][0-9,]*(?:\.\d+)?$")
-
-NOISE_LABELS = {
-    "支給",
-    "控除",
-    "勤怠",
-    "備考",
-    "摘要",
-    "所属",
-    "社員番号",
-    "氏名",
-    "明細",
-}
-
-
-def normalize_text(value: str) -> str:
-    return (value or "").replace("\u3000", " ").replace("¥", "").strip()
-
-
-def clean_number(value: str) -> str:
-    return normalize_text(value).replace(",", "")
-
-
-def clean_label(value: str) -> str:
-    return re.sub(r"^[:：\-\s]+|[:：\-\s]+$", "", normalize_text(value))
-
-
-def is_valid_label(label: str) -> bool:
-    return bool(label) and len(label) <= 40 and not NUMBER_ONLY_PATTERN.match(label) and label not in NOISE_LABELS
-
-
-def extract_month(text: str) -> Optional[str]:
-    match = MONTH_PATTERN.search(normalize_text(text))
-    if not match:
-        return None
-    year = int(match.group(1))
-    month = int(match.group(2))
-    if month < 1 or month > 12:
-        return None
-    return f"{year:04d}-{month:02d}-01"
-
-
-def classify_slip_type(file_name: str) -> str:
-    return "賞与" if file_name.upper().startswith("SYO") else "給与"
-
-
-def extract_details(text: str) -> dict[str, str]:
-    details: dict[str, str] = {}
-    pending_label: Optional[str] = None
-
-    for raw_line in text.splitlines():
-        line = normalize_text(raw_line)
-        if not line:
-            continue
-
-        if pending_label and NUMBER_ONLY_PATTERN.match(line):
-            details[pending_label] = clean_number(line)
-            pending_label = None
-            continue
-
-        for label, number in INLINE_NUMBER_PATTERN.findall(line):
-            normalized_label = clean_label(label)
-            if is_valid_label(normalized_label):
-                details[normalized_label] = clean_number(number)
-
-        trailing = TRAILING_NUMBER_PATTERN.match(line)
-        if trailing:
-            normalized_label = clean_label(trailing.group(1))
-            if is_valid_label(normalized_label):
-                details[normalized_label] = clean_number(trailing.group(2))
-                pending_label = None
-                continue
-
-        if line.endswith(":") or line.endswith("："):
-            normalized_label = clean_label(line[:-1])
-            pending_label = normalized_label if is_valid_label(normalized_label) else None
+from payroll_core import (  # noqa: E402
+    EXTRACTION_MODES,
+    SNAPSHOT_PRESETS,
+    cache_enabled_by_env,
+    open_default_cache,
+    parse_pdf_bytes as parse_payroll_pdf,
+)
+
+MAX_BODY_BYTES = int(os.getenv("PAYROLL_MAX_BODY_BYTES", str(20 * 1024 * 1024)))
+MAX_BATCH_FILES = int(os.getenv("PAYROLL_MAX_BATCH_FILES", "500"))
+# Total unzipped size of one batch; a small, highly compressed archive must not expand into gigabytes in memory.
+MAX_BATCH_BYTES = int(os.getenv("PAYROLL_MAX_BATCH_BYTES", str(100 * 1024 * 1024)))
+MULTIPART_CONTENT_TYPE = "multipart/form-data"
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed"}
+PDF_MAGIC = b"%PDF-"
+# Readers accept the PDF header anywhere in the first 1024 bytes, so that is how much is sniffed.
+PDF_HEADER_WINDOW = 1024
+
+_result_cache = None
+
+
+def get_result_cache():
+    global _result_cache
+    if _result_cache is None and cache_enabled_by_env():
+        path = os.getenv("PAYROLL_CACHE_PATH") or os.path.join(tempfile.gettempdir(), "flola-payroll-cache.sqlite3")
+        _result_cache = open_default_cache(path, include_snapshots=False)
+    return _result_cache
+
+
+def parse_pdf_bytes(pdf_bytes: Union[bytes, bytearray, memoryview], file_name: str, mode: str = "text"):
+    if mode not in EXTRACTION_MODES:
+        raise ValueError("UNKNOWN_EXTRACTION_MODE")
+    if isinstance(pdf_bytes, bytearray):
+        # PyMuPDF copies a bytearray into bytes but reads a memoryview in place.
+        pdf_bytes = memoryview(pdf_bytes)
+
+    result = parse_payroll_pdf(pdf_bytes, file_name, SNAPSHOT_PRESETS["none"], get_result_cache(), mode)
+    if result is None or "error" in result:
+        raise ValueError("PARSER_EXTRACTION_FAILED")
+    return result
+
+
+class NotPdfError(ValueError):
+    pass
+
+
+class ParseTimeoutError(Exception):
+    """Raised by a ``_parse`` that gave up waiting for its worker; answered with 504."""
+
+
+def looks_like_pdf(data: Union[bytes, bytearray]) -> bool:
+    return PDF_MAGIC in data[:PDF_HEADER_WINDOW]
+
+
+def read_into(rfile: BinaryIO, view: memoryview) -> None:
+    """Fill ``view`` from ``rfile``; raises ValueError when the client sends less than it announced."""
+    received = 0
+    while received < len(view):
+        count = rfile.readinto(view[received:])
+        if not count:
+            raise ValueError("INCOMPLETE_BODY")
+        received += count
+
+
+def discard_body(rfile: BinaryIO, remaining: int) -> None:
+    """Read and drop ``remaining`` bytes in small chunks, so a rejected upload is never held in memory."""
+    while remaining > 0:
+        chunk = rfile.read(min(remaining, 64 * 1024))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+
+
+def read_body(rfile: BinaryIO, content_length: int, sniff_pdf: bool) -> memoryview:
+    """Read the body into one preallocated buffer, checking the PDF header before the rest is read.
+
+    The returned view goes to PyMuPDF as is; ``fitz.open(stream=...)`` takes a memoryview without copying it.
+    """
+    head = bytearray(min(content_length, PDF_HEADER_WINDOW))
+    read_into(rfile, memoryview(head))
+    if sniff_pdf and not looks_like_pdf(head):
+        raise NotPdfError("NOT_A_PDF")
+
+    body = memoryview(bytearray(content_length))
+    head_length = len(head)
+    body[:head_length] = head
+    read_into(rfile, body[head_length:])
+    return body
+
+
+def extract_multipart_files(body: Union[bytes, memoryview], content_type: str) -> list[tuple[str, bytes]]:
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+    )
+    if not message.is_multipart():
+        raise ValueError("INVALID_BATCH_BODY")
+
+    files = []
+    for part in message.iter_parts():
+        file_name = part.get_filename()
+        if not file_name:
             continue
-
-        pending_label = None
-
-    return details
+        files.append((file_name, part.get_payload(decode=True) or b""))
+    return files
 
 
-def parse_pdf_bytes(pdf_bytes: bytes, file_name: str):
-    with fitz.open(stream=BytesIO(pdf_bytes), filetype="pdf") as document:
-        if len(document) == 0:
-            raise ValueError("PARSER_EXTRACTION_FAILED")
+def extract_zip_files(body: Union[bytes, memoryview], max_file_bytes: int) -> list[tuple[str, bytes]]:
+    try:
+        archive = zipfile.ZipFile(BytesIO(body))
+    except zipfile.BadZipFile:
+        raise ValueError("INVALID_BATCH_BODY") from None
 
-        page = document[0]
-        text = page.get_text("text", sort=True)
-        details = extract_details(text)
-        if not details:
-            raise ValueError("PARSER_EXTRACTION_FAILED")
-
-        return {
-            "month": extract_month(text),
-            "type": classify_slip_type(file_name),
-            "details": details,
-        }
+    files = []
+    total_bytes = 0
+    with archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(".pdf"):
+                continue
+            if len(files) >= MAX_BATCH_FILES:
+                raise ValueError("TOO_MANY_FILES")
+            # file_size is the declared size, and zipfile never decompresses an entry past it.
+            total_bytes += info.file_size
+            if info.file_size > max_file_bytes or total_bytes > MAX_BATCH_BYTES:
+                raise ValueError("PAYLOAD_TOO_LARGE")
+            files.append((os.path.basename(info.filename), archive.read(info)))
+    return files
+
+
+def extract_batch_files(
+    body: Union[bytes, memoryview], content_type: str, max_file_bytes: int
+) -> list[tuple[str, bytes]]:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type == MULTIPART_CONTENT_TYPE:
+        files = extract_multipart_files(body, content_type)
+    else:
+        files = extract_zip_files(body, max_file_bytes)
+
+    if not files:
+        raise ValueError("NO_FILE_PROVIDED")
+    if len(files) > MAX_BATCH_FILES:
+        raise ValueError("TOO_MANY_FILES")
+    return files
+
+
+def parse_batch_item(index: int, file_name: str, pdf_bytes: bytes, mode: str = "text") -> dict:
+    record = {"index": index, "filename": file_name}
+    try:
+        return {**record, "success": True, "data": parse_pdf_bytes(pdf_bytes, file_name, mode)}
+    except ValueError as error:
+        return {**record, "success": False, "error": str(error)}
+    except Exception as error:
+        return {**record, "success": False, "error": f"UNEXPECTED_PAYROLL_ERROR:{error}"}
+
+
+_batch_executor: Optional[Executor] = None
+
+
+def get_batch_executor() -> Executor:
+    global _batch_executor
+    if _batch_executor is None:
+        try:
+            _batch_executor = ProcessPoolExecutor()
+        except (OSError, NotImplementedError):
+            # Serverless sandboxes without /dev/shm cannot create process pools.
+            _batch_executor = ThreadPoolExecutor()
+    return _batch_executor
 
 
 class handler(BaseHTTPRequestHandler):
+    max_body_bytes = MAX_BODY_BYTES
+
     def do_POST(self):
         try:
             content_length = int(self.headers.get("content-length", "0"))
             file_name = self.headers.get("x-payroll-filename", "payroll.pdf")
-            body = self.rfile.read(content_length)
 
-            if not body:
+            if content_length > self.max_body_bytes:
+                self.close_connection = True
+                self._json_response(413, {"success": False, "error": "PAYLOAD_TOO_LARGE"})
+                return
+
+            if content_length <= 0:
                 self._json_response(400, {"success": False, "error": "NO_FILE_PROVIDED"})
                 return
 
-            result = parse_pdf_bytes(body, file_name)
+            content_type = self.headers.get("content-type", "")
+            media_type = content_type.split(";", 1)[0].strip().lower()
+            is_batch = media_type == MULTIPART_CONTENT_TYPE or media_type in ZIP_CONTENT_TYPES
+            try:
+                body = read_body(self.rfile, content_length, sniff_pdf=not is_batch)
+            except NotPdfError as error:
+                # Unread request bytes make the close send a TCP reset, which can eat the 415.
+                discard_body(self.rfile, content_length - PDF_HEADER_WINDOW)
+                self.close_connection = True
+                self._json_response(415, {"success": False, "error": str(error)})
+                return
+
+            if is_batch:
+                files = extract_batch_files(body, content_type, self.max_body_bytes)
+                self._stream_batch(files, self._extraction_mode())
+                return
+
+            result = self._parse(body, file_name, self._extraction_mode())
             self._json_response(200, {"success": True, "data": result})
         except ValueError as error:
             self._json_response(200, {"success": False, "error": str(error)})
+        except ParseTimeoutError:
+            self._json_response(504, {"success": False, "error": "PARSE_TIMEOUT"})
         except Exception as error:
             self._json_response(500, {"success": False, "error": f"UNEXPECTED_PAYROLL_ERROR:{error}"})
 
+    def _extraction_mode(self) -> str:
+        query = parse_qs(urlsplit(self.path).query)
+        return (query.get("mode") or [self.headers.get("x-payroll-mode", "text")])[0]
+
+    def _parse(self, body: Union[bytes, memoryview], file_name: str, mode: str):
+        return parse_pdf_bytes(body, file_name, mode)
+
+    def _batch_executor(self) -> Executor:
+        return get_batch_executor()
+
+    def _batch_window(self) -> int:
+        """How many files of one batch are in the executor at once; the next is submitted as one finishes."""
+        return os.cpu_count() or 1
+
+    def _stream_batch(self, files: list[tuple[str, bytes]], mode: str):
+        """Parse ``files`` in parallel and write one NDJSON record per file as each finishes.
+
+        The headers go out first, and files are submitted as earlier ones finish, so the first record is written
+        while the rest of the batch is still waiting for a worker.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.close_connection = True
+
+        executor = self._batch_executor()
+        window = self._batch_window()
+        queued = iter(enumerate(files))
+        running: Dict[Future, Tuple[int, str]] = {}
+        while True:
+            for index, (file_name, pdf_bytes) in queued:
+                # Rejected the way a single upload is, without a trip to the pool.
+                if not looks_like_pdf(pdf_bytes):
+                    self._write_record({"index": index, "filename": file_name, "success": False, "error": "NOT_A_PDF"})
+                    continue
+                running[executor.submit(parse_batch_item, index, file_name, pdf_bytes, mode)] = (index, file_name)
+                if len(running) >= window:
+                    break
+            if not running:
+                return
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, file_name = running.pop(future)
+                try:
+                    record = future.result()
+                except Exception as error:
+                    record = {
+                        "index": index,
+                        "filename": file_name,
+                        "success": False,
+                        "error": f"UNEXPECTED_PAYROLL_ERROR:{error}",
+                    }
+                self._write_record(record)
+
+    def _write_record(self, record: dict):
+        self.wfile.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
     def do_GET(self):
         self._json_response(200, {"ok": True, "service": "payroll-parse"})
 
-    def _json_response(self, status: int, payload: dict):
+    def _json_response(self, status: int, payload: dict, headers: Optional[dict] = None):
         self.send_response(status)
         self.send_header("Content-Type", "application/json; charset=utf-8")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
         self.wfile.write(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
@@ -0,0 +1,181 @@
+"""Self-hosted payroll parse server.
+
+Runs the same ``handler`` as the Vercel function behind a threading HTTP
+front end, with the CPU-bound PyMuPDF work handed to a process pool:
+
+    python serve.py --port 8000 --workers 4 --queue-depth 8
+
+At most ``workers + queue_depth`` POSTs are admitted at once; anything beyond
+that is answered with 503 and ``Retry-After`` without being parsed. A body
+of up to ``BUSY_DRAIN_BYTES`` is read and dropped first, so that closing the
+connection does not reset it before the client sees the 503. Larger bodies
+are not read at all. A parse that outlives ``--request-timeout`` is
+answered with 504 ``PARSE_TIMEOUT``. It keeps its admission slot until the
+worker finishes, because a running parse cannot be cancelled.
+
+A batch request holds one admission slot. Its response starts right away,
+and it keeps at most ``workers`` of its files in the pool, submitting the
+next one as each finishes. Every submission goes through
+``BoundedExecutor``, so at most ``workers`` batch files across all batches
+are queued or parsing at a time. A large batch therefore waits for pool
+capacity instead of queueing hundreds of files ahead of single requests.
+"""
+
+import argparse
+import os
+import sys
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, TimeoutError
+from http.server import ThreadingHTTPServer
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api"))
+
+from index import MAX_BODY_BYTES, ParseTimeoutError, discard_body, handler, parse_pdf_bytes  # noqa: E402
+
+BUSY_DRAIN_BYTES = 64 * 1024
+
+
+def available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+class BoundedExecutor(Executor):
+    """Submits to ``executor``, blocking while ``limit`` earlier submissions are still queued or running."""
+
+    def __init__(self, executor: Executor, limit: int):
+        self.executor = executor
+        self.slots = threading.BoundedSemaphore(limit)
+
+    def submit(self, fn, *args) -> Future:
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+
+class PooledHandler(handler):
+    server: "PayrollParseServer"
+
+    @property
+    def max_body_bytes(self) -> int:
+        return self.server.max_body_bytes
+
+    def do_POST(self):
+        if not self.server.admission.acquire(blocking=False):
+            self._discard_body()
+            self.close_connection = True
+            self._json_response(503, {"success": False, "error": "SERVER_BUSY"}, {"Retry-After": "1"})
+            return
+        self.admission_held_by: Optional[Future] = None
+        try:
+            super().do_POST()
+        finally:
+            if self.admission_held_by is None:
+                self.server.admission.release()
+            else:
+                self.admission_held_by.add_done_callback(lambda _: self.server.admission.release())
+
+    def _discard_body(self):
+        # Unread request bytes make the close send a TCP reset, which can eat the 503. Only small bodies are worth
+        # reading for that; a busy server should not spend its bandwidth on uploads it will not parse.
+        try:
+            remaining = int(self.headers.get("content-length", "0"))
+        except ValueError:
+            return
+        if remaining > BUSY_DRAIN_BYTES:
+            return
+        discard_body(self.rfile, remaining)
+
+    def _parse(self, body: memoryview, file_name: str, mode: str):
+        # A memoryview cannot be pickled for the worker; the bytearray under it can, without a copy here.
+        future = self.server.executor.submit(parse_pdf_bytes, body.obj, file_name, mode)
+        try:
+            return future.result(timeout=self.server.request_timeout)
+        except TimeoutError:
+            # Still queued, it is dropped. Already running, it keeps a worker busy, so the slot stays taken until then.
+            if not future.cancel():
+                self.admission_held_by = future
+            raise ParseTimeoutError() from None
+
+    def _batch_executor(self):
+        return self.server.batch_executor
+
+    def _batch_window(self) -> int:
+        return self.server.workers
+
+
+class PayrollParseServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        address,
+        workers: int,
+        queue_depth: int,
+        max_body_bytes: int = MAX_BODY_BYTES,
+        request_timeout: float = 120.0,
+    ):
+        super().__init__(address, PooledHandler)
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.batch_executor = BoundedExecutor(self.executor, workers)
+        self.admission = threading.BoundedSemaphore(workers + queue_depth)
+        self.max_body_bytes = max_body_bytes
+        self.request_timeout = request_timeout
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(cancel_futures=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default=os.getenv("PAYROLL_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PAYROLL_PORT", "8000")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("PAYROLL_WORKERS", "0")) or available_cores(),
+        help="parser processes, i.e. requests parsed concurrently (default: available cores)",
+    )
+    parser.add_argument(
+        "--queue-depth",
+        type=int,
+        default=int(os.getenv("PAYROLL_QUEUE_DEPTH", "-1")),
+        help="requests allowed to wait for a worker before 503 (default: 2 x workers)",
+    )
+    parser.add_argument("--max-body-bytes", type=int, default=MAX_BODY_BYTES)
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    queue_depth = args.queue_depth if args.queue_depth >= 0 else args.workers * 2
+    server = PayrollParseServer(
+        (args.host, args.port),
+        workers=args.workers,
+        queue_depth=queue_depth,
+        max_body_bytes=args.max_body_bytes,
+        request_timeout=args.request_timeout,
+    )
+    print(
+        f"[INFO] Payroll parser listening on http://{args.host}:{server.server_port} "
+        f"(workers={args.workers}, queue_depth={queue_depth})",
+        flush=True,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
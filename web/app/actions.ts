@@ -4,10 +4,13 @@ import { createClient } from '@/utils/supabase/server'
 import { GoogleGenerativeAI } from '@google/generative-ai'
 import { revalidatePath, revalidateTag } from 'next/cache'
 import { SCRAPER_JOB_CONFIG_MAP } from '@/lib/jobs/config'
-import { execFile } from 'child_process'
-import { access, writeFile, unlink } from 'fs/promises'
+import {
+  getPayrollParserWorker,
+  type PayrollParserResult,
+  type PayrollSnapshotPolicy,
+} from '@/lib/payroll/parser-worker'
+import { access } from 'fs/promises'
 import path from 'path'
-import { tmpdir } from 'os'
 
 // --- 型定義 ---
 type TransactionFilter = {
@@ -58,30 +61,6 @@ type SalarySlipInput = {
   details: Record<string, unknown>
 }
 
-type CommandCandidate = {
-  command: string
-  args?: string[]
-}
-
-function getPayrollPythonCandidates(): CommandCandidate[] {
-  const candidates: CommandCandidate[] = []
-  const envCommand = process.env.PAYROLL_PYTHON_CMD?.trim()
-
-  if (envCommand) {
-    candidates.push({ command: envCommand })
-  }
-
-  if (process.platform === 'win32') {
-    candidates.push({ command: 'py', args: ['-3'] })
-    candidates.push({ command: 'py' })
-  }
-
-  candidates.push({ command: 'python3' })
-  candidates.push({ command: 'python' })
-
-  return candidates
-}
-
 function getPayrollParseApiUrl() {
   const explicitUrl = process.env.PAYROLL_PARSE_API_URL?.trim()
   if (explicitUrl) {
@@ -997,10 +976,9 @@ export async function getSalaryHistory() {
 }
 
 /**
- * 給与PDFの解析 (Pythonスクリプトの呼び出し)
+ * 給与PDFの解析 (常駐 Python ワーカーの呼び出し)
  */
 export async function analyzePayrollPdf(formData: FormData) {
-  let tempPath: string | null = null
   try {
   const file = formData.get('file') as File
   if (!file) {
@@ -1010,11 +988,6 @@ export async function analyzePayrollPdf(formData: FormData) {
   const bytes = await file.arrayBuffer()
   const buffer = Buffer.from(bytes)
 
-  // 一時ファイルとして保存
-    tempPath = path.join(tmpdir(), `payroll_${Date.now()}.pdf`)
-    const tempFilePath = tempPath
-    await writeFile(tempFilePath, buffer)
-
   const scriptPath = path.join(process.cwd(), '..', 'collectors', 'payroll_parser.py')
 
   try {
@@ -1023,40 +996,16 @@ export async function analyzePayrollPdf(formData: FormData) {
     return { success: false as const, error: 'PARSER_SCRIPT_NOT_FOUND' }
   }
 
-  const parserCommands = getPayrollPythonCandidates()
-  if (parserCommands.length === 0) {
-    return { success: false as const, error: 'PYTHON_NOT_FOUND' }
-  }
-  let stdout = ''
-  let lastError: string | null = null
-
-  for (const candidate of parserCommands) {
-    try {
-      const output = await new Promise<string>((resolve, reject) => {
-          execFile(candidate.command, [...(candidate.args || []), scriptPath, tempFilePath], { timeout: 120000 }, (error, out, stderr) => {
-          if (error) {
-            reject(new Error(stderr || error.message))
-            return
-          }
-          resolve(out)
-        })
-      })
-      stdout = output
-      lastError = null
-      break
-    } catch (error: unknown) {
-      if (error instanceof Error) {
-        lastError = error.message
-      } else {
-        lastError = 'Unknown parser error'
-      }
-    }
-  }
-
-  if (lastError !== null) {
-    console.error('Python Error:', lastError)
-
-    const lowered = lastError.toLowerCase()
+  let parsed: PayrollParserResult
+  try {
+    // 画面ではスナップショットを表示しないため、既定ではレンダリング自体を省く
+    const snapshotPolicy = (process.env.PAYROLL_SNAPSHOT_POLICY?.trim() || 'none') as PayrollSnapshotPolicy
+    parsed = await getPayrollParserWorker(scriptPath).parse(buffer, file.name, snapshotPolicy)
+  } catch (error: unknown) {
+    const message = error instanceof Error ? error.message : 'Unknown parser error'
+    console.error('Python Error:', message)
+
+    const lowered = message.toLowerCase()
     if (lowered.includes('not found') || lowered.includes('enoent')) {
       return { success: false as const, error: 'PYTHON_NOT_FOUND' }
     }
@@ -1064,25 +1013,16 @@ export async function analyzePayrollPdf(formData: FormData) {
     return { success: false as const, error: 'PARSER_EXECUTION_FAILED' }
   }
 
-  try {
-    const parsed = JSON.parse(stdout)
-    if (parsed?.error) {
-      return { success: false as const, error: 'PARSER_EXTRACTION_FAILED' }
-    }
-    return { success: true as const, data: parsed }
-  } catch {
-    return { success: false as const, error: 'PARSER_OUTPUT_INVALID_JSON' }
+  if (parsed?.error) {
+    return { success: false as const, error: 'PARSER_EXTRACTION_FAILED' }
   }
+  return { success: true as const, data: parsed }
   } catch (error) {
     console.error('Unexpected payroll parser error:', error)
     return {
       success: false as const,
       error: error instanceof Error ? `UNEXPECTED_PAYROLL_ERROR:${error.message}` : 'UNEXPECTED_PAYROLL_ERROR',
     }
-  } finally {
-    if (tempPath) {
-      await unlink(tempPath).catch(console.error)
-    }
   }
 }
 
@@ -90,6 +90,7 @@ function getErrorMessage(error: unknown) {
 
 function getJobBadgeColor(status: string) {
   if (status === 'success') return 'green'
+  if (status === 'skipped_unchanged') return 'teal'
   if (status === 'failed') return 'red'
   if (status === 'running') return 'blue'
   return 'gray'
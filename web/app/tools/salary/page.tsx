@@ -90,6 +90,9 @@ function getFriendlyPayrollErrorMessage(error: unknown) {
   if (message.includes('PARSER_EXTRACTION_FAILED')) {
     return 'PDF は読み込めましたが、給与明細として必要な項目を抽出できませんでした。'
   }
+  if (message.includes('PARSE_TIMEOUT')) {
+    return '給与明細の解析が時間内に終わりませんでした。しばらくしてから再度お試しください。'
+  }
   if (message.includes('UNEXPECTED_PAYROLL_ERROR:')) {
     return message.replace('UNEXPECTED_PAYROLL_ERROR:', '予期しない解析エラー: ')
   }
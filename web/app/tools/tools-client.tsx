@@ -75,6 +75,7 @@ export function ToolsClient({ initialJobs }: ToolsClientProps) {
 
     const colors: Record<string, string> = {
       success: 'green',
+      skipped_unchanged: 'teal',
       failed: 'red',
       running: 'blue',
     }
@@ -92,8 +92,8 @@ const AdminDashboard: React.FC<AdminDashboardProps> = ({
                   <div>
                     <p className="text-xs font-black text-slate-800 font-mono mb-1">{job.job_id}</p>
                     <div className="flex items-center gap-2">
-                      <div className={`w-2 h-2 rounded-full ${job.last_status === 'success' ? 'bg-emerald-500' : 'bg-rose-500'} animate-pulse`} />
-                      <span className="text-[10px] text-slate-400 font-bold uppercase">{job.last_status === 'success' ? '正常稼働中' : 'エラー発生'}</span>
+                      <div className={`w-2 h-2 rounded-full ${job.last_status !== 'failed' ? 'bg-emerald-500' : 'bg-rose-500'} animate-pulse`} />
+                      <span className="text-[10px] text-slate-400 font-bold uppercase">{job.last_status !== 'failed' ? '正常稼働中' : 'エラー発生'}</span>
                     </div>
                   </div>
                   <button onClick={() => handleRun(job.job_id)} disabled={running[job.job_id]} className="p-3 bg-slate-900 text-white rounded-2xl active:scale-90 transition-all disabled:opacity-30">
@@ -0,0 +1,195 @@
+import { spawn, type ChildProcessWithoutNullStreams } from 'child_process'
+import { createInterface } from 'readline'
+
+type CommandCandidate = {
+  command: string
+  args?: string[]
+}
+
+type PendingRequest = {
+  child: ChildProcessWithoutNullStreams
+  resolve: (result: PayrollParserResult) => void
+  reject: (error: Error) => void
+  timer: NodeJS.Timeout
+}
+
+export type PayrollParserResult = Record<string, unknown> & { error?: string }
+
+export type PayrollSnapshotPolicy = 'none' | 'png' | 'thumbnail' | 'jpeg' | 'webp'
+
+const STARTUP_TIMEOUT_MS = 30000
+const REQUEST_TIMEOUT_MS = 120000
+
+export function getPayrollPythonCandidates(): CommandCandidate[] {
+  const candidates: CommandCandidate[] = []
+  const envCommand = process.env.PAYROLL_PYTHON_CMD?.trim()
+
+  if (envCommand) {
+    candidates.push({ command: envCommand })
+  }
+
+  if (process.platform === 'win32') {
+    candidates.push({ command: 'py', args: ['-3'] })
+    candidates.push({ command: 'py' })
+  }
+
+  candidates.push({ command: 'python3' })
+  candidates.push({ command: 'python' })
+
+  return candidates
+}
+
+/**
+ * `payroll_parser.py --serve` を常駐させ、JSON Lines で解析要求を送るワーカー。
+ * インタプリタ起動と PyMuPDF の import は初回だけで済む。
+ */
+class PayrollParserWorker {
+  private child: ChildProcessWithoutNullStreams | null = null
+  private starting: Promise<ChildProcessWithoutNullStreams> | null = null
+  private pending = new Map<number, PendingRequest>()
+  private nextId = 1
+
+  constructor(private readonly scriptPath: string) {}
+
+  async parse(pdf: Buffer, filename: string, snapshot: PayrollSnapshotPolicy = 'none'): Promise<PayrollParserResult> {
+    const child = await this.ensureStarted()
+    const id = this.nextId++
+
+    return new Promise<PayrollParserResult>((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id)
+        reject(new Error('Payroll parser request timed out'))
+        this.restart()
+      }, REQUEST_TIMEOUT_MS)
+
+      this.pending.set(id, { child, resolve, reject, timer })
+      const line = JSON.stringify({ id, filename, snapshot, pdf: pdf.toString('base64') })
+      child.stdin.write(`${line}\n`)
+    })
+  }
+
+  private ensureStarted(): Promise<ChildProcessWithoutNullStreams> {
+    if (this.child) return Promise.resolve(this.child)
+    if (!this.starting) {
+      this.starting = this.startFirstAvailable().finally(() => {
+        this.starting = null
+      })
+    }
+    return this.starting
+  }
+
+  private async startFirstAvailable(): Promise<ChildProcessWithoutNullStreams> {
+    let lastError: Error = new Error('PYTHON_NOT_FOUND')
+
+    for (const candidate of getPayrollPythonCandidates()) {
+      try {
+        const child = await this.spawnWorker(candidate)
+        this.child = child
+        return child
+      } catch (error: unknown) {
+        lastError = error instanceof Error ? error : new Error('Unknown parser error')
+      }
+    }
+
+    throw lastError
+  }
+
+  private spawnWorker(candidate: CommandCandidate): Promise<ChildProcessWithoutNullStreams> {
+    return new Promise((resolve, reject) => {
+      const child = spawn(candidate.command, [...(candidate.args || []), this.scriptPath, '--serve'], {
+        stdio: ['pipe', 'pipe', 'pipe'],
+      })
+      let ready = false
+      let stderr = ''
+
+      const startupTimer = setTimeout(() => {
+        child.kill()
+        reject(new Error(stderr || 'Payroll parser worker did not become ready'))
+      }, STARTUP_TIMEOUT_MS)
+
+      child.stderr.on('data', (chunk: Buffer) => {
+        stderr = (stderr + chunk.toString('utf-8')).slice(-4000)
+      })
+
+      child.on('error', (error) => {
+        clearTimeout(startupTimer)
+        if (!ready) reject(error)
+      })
+
+      // ワーカーが落ちた後の書き込みは EPIPE になる。未処理のままだと Next のプロセスごと落ちるので、ここで受けて要求を失敗させる
+      child.stdin.on('error', (error) => {
+        if (this.child === child) this.child = null
+        this.failPending(child, error)
+      })
+
+      child.on('exit', () => {
+        clearTimeout(startupTimer)
+        if (!ready) {
+          reject(new Error(stderr || 'Payroll parser worker exited during startup'))
+          return
+        }
+        if (this.child === child) this.child = null
+        this.failPending(child, new Error(stderr || 'Payroll parser worker exited'))
+      })
+
+      const lines = createInterface({ input: child.stdout })
+      lines.on('line', (line) => {
+        let message: { ready?: boolean, id?: number, result?: PayrollParserResult }
+        try {
+          message = JSON.parse(line)
+        } catch {
+          // PyMuPDF の非推奨警告など JSON 以外の行は無視する
+          return
+        }
+
+        if (message.ready) {
+          ready = true
+          clearTimeout(startupTimer)
+          resolve(child)
+          return
+        }
+
+        if (typeof message.id !== 'number') return
+        const request = this.pending.get(message.id)
+        if (!request) return
+
+        this.pending.delete(message.id)
+        clearTimeout(request.timer)
+        request.resolve(message.result || { error: 'Failed to parse PDF' })
+      })
+    })
+  }
+
+  private restart() {
+    const child = this.child
+    this.child = null
+    child?.kill()
+  }
+
+  /** `child` に送った要求だけを失敗させる。restart() 後の古いプロセスの終了で、新しいプロセスへの要求を巻き込まない */
+  private failPending(child: ChildProcessWithoutNullStreams, error: Error) {
+    for (const [id, request] of this.pending) {
+      if (request.child !== child) continue
+      this.pending.delete(id)
+      clearTimeout(request.timer)
+      request.reject(error)
+    }
+  }
+}
+
+const globalForPayroll = globalThis as unknown as {
+  payrollParserWorkers?: Map<string, PayrollParserWorker>
+}
+
+/**
+ * スクリプトパスごとに 1 つのワーカーを共有する。開発時の HMR でも再生成しないよう globalThis に保持する。
+ */
+export function getPayrollParserWorker(scriptPath: string): PayrollParserWorker {
+  const workers = globalForPayroll.payrollParserWorkers ??= new Map()
+  let worker = workers.get(scriptPath)
+  if (!worker) {
+    worker = new PayrollParserWorker(scriptPath)
+    workers.set(scriptPath, worker)
+  }
+  return worker
+}
@@ -0,0 +1,20 @@
+-- Allow job_status.last_status = 'skipped_unchanged' (and 'running', written while a collector runs).
+-- The table predates these migrations: if last_status is an enum type, add the values to it;
+-- as plain text it already accepts them.
+DO $$
+DECLARE
+  v_type text;
+BEGIN
+  SELECT udt_name INTO v_type
+  FROM information_schema.columns
+  WHERE table_schema = 'public'
+    AND table_name = 'job_status'
+    AND column_name = 'last_status'
+    AND data_type = 'USER-DEFINED';
+
+  IF v_type IS NOT NULL THEN
+    EXECUTE format('ALTER TYPE %I ADD VALUE IF NOT EXISTS %L', v_type, 'running');
+    EXECUTE format('ALTER TYPE %I ADD VALUE IF NOT EXISTS %L', v_type, 'skipped_unchanged');
+  END IF;
+END
+$$;
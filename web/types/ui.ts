@@ -62,7 +62,7 @@ export interface SystemLog {
 export interface JobStatus {
   job_id: string;
   last_run_at: string;
-  last_status: 'success' | 'failed';
+  last_status: 'success' | 'skipped_unchanged' | 'failed';
   next_scheduled_at: string;
 }
 